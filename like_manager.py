@@ -4,7 +4,11 @@
 import html
 import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from dataclasses import dataclass
+from datetime import datetime
 from http import HTTPStatus
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from typing import Any, Dict, List, Optional, Tuple
@@ -12,6 +16,18 @@ from urllib.parse import parse_qs, urlparse
 
 import requests
 
+from qq_auto_like_bot import Metrics, plan_from_payload
+
+METRICS = Metrics()
+FANOUT_SECONDS = METRICS.histogram("qqlike_manager_fanout_seconds", "Time to aggregate all bots in seconds")
+BOT_FETCH_SECONDS = METRICS.histogram(
+    "qqlike_manager_bot_fetch_seconds", "Per-bot snapshot fetch time in seconds", ("bot", "result")
+)
+REQUEST_SECONDS = METRICS.histogram(
+    "qqlike_manager_request_seconds", "Manager HTTP request handling time in seconds", ("method", "route")
+)
+_ROUTES = {"", "/", "/metrics", "/api/bots", "/api/bot/toggle_schedule", "/api/bot/run", "/api/bot/job", "/api/plan", "/api/stream"}
+
 
 def _parse_bots(value: str) -> List[Tuple[str, str]]:
     bots: List[Tuple[str, str]] = []
@@ -57,6 +73,304 @@ class BotInfo:
     base_url: str
 
 
+_LEGACY_ENDPOINTS = ("config", "state", "next_run", "napcat")
+
+
+class SnapshotCache:
+    """按 bot 缓存最近一次 /api/snapshot 的 ETag 和整理好的结果，304 时直接复用。"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+
+    def get(self, name: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        with self._lock:
+            return self._entries.get(name)
+
+    def put(self, name: str, etag: str, item: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[name] = (etag, item)
+
+
+def _bot_item(bot: BotInfo, snapshot: Dict[str, Any], error: str) -> Dict[str, Any]:
+    next_run = snapshot.get("next_run")
+    if isinstance(next_run, dict):
+        next_run = next_run.get("next_run")
+    return {
+        "name": bot.name,
+        "base_url": bot.base_url,
+        "config": snapshot.get("config") or {},
+        "state": snapshot.get("state") or {},
+        "next_run": next_run or "",
+        "napcat": snapshot.get("napcat") or {},
+        "error": error,
+    }
+
+
+def _fetch_bot_legacy(bot: BotInfo, timeout: float) -> Dict[str, Any]:
+    # 兼容尚未提供 /api/snapshot 的旧版 like-bot
+    snapshot: Dict[str, Any] = {}
+    errors: List[str] = []
+    for ep in _LEGACY_ENDPOINTS:
+        data, err = _safe_get_json(f"{bot.base_url}/api/{ep}", timeout)
+        snapshot[ep] = data
+        if err:
+            errors.append(err)
+    return _bot_item(bot, snapshot, "; ".join(errors))
+
+
+def _fetch_bot(bot: BotInfo, timeout: float, cache: SnapshotCache) -> Dict[str, Any]:
+    cached = cache.get(bot.name)
+    headers = {"If-None-Match": cached[0]} if cached else {}
+    try:
+        r = requests.get(f"{bot.base_url}/api/snapshot", headers=headers, timeout=timeout)
+        if r.status_code == HTTPStatus.NOT_MODIFIED and cached:
+            return dict(cached[1], not_modified=True)
+        if r.status_code == HTTPStatus.NOT_FOUND:
+            return _fetch_bot_legacy(bot, timeout)
+        r.raise_for_status()
+        snapshot = r.json()
+    except Exception as e:
+        return _bot_item(bot, {}, str(e))
+
+    item = _bot_item(bot, snapshot if isinstance(snapshot, dict) else {}, "")
+    etag = r.headers.get("ETag")
+    if etag:
+        cache.put(bot.name, etag, item)
+    return item
+
+
+def _timed_fetch(bot: BotInfo, timeout: float, cache: SnapshotCache) -> Tuple[Dict[str, Any], float]:
+    t0 = time.perf_counter()
+    item = _fetch_bot(bot, timeout, cache)
+    elapsed = time.perf_counter() - t0
+    result = "error" if item.get("error") else ("not_modified" if item.get("not_modified") else "ok")
+    BOT_FETCH_SECONDS.observe(elapsed, bot.name, result)
+    return item, elapsed
+
+
+def _collect_bots(
+    bots: List[BotInfo], timeout: float, deadline: float, pool: ThreadPoolExecutor, cache: SnapshotCache
+) -> List[Dict[str, Any]]:
+    # 整体最多等待 deadline 秒，超时的 bot 按失败处理
+    started = time.perf_counter()
+    futures = [pool.submit(_timed_fetch, bot, timeout, cache) for bot in bots]
+    wait(futures, timeout=deadline)
+
+    out: List[Dict[str, Any]] = []
+    for bot, fut in zip(bots, futures):
+        if not fut.done():
+            fut.cancel()
+            item = _bot_item(bot, {}, f"timeout after {deadline:g}s")
+            elapsed = time.perf_counter() - started
+            BOT_FETCH_SECONDS.observe(elapsed, bot.name, "timeout")
+        else:
+            item, elapsed = fut.result()
+        item["elapsed_ms"] = round(elapsed * 1000, 1)
+        out.append(item)
+    FANOUT_SECONDS.observe(time.perf_counter() - started)
+    return out
+
+
+# 后台按 bot 拉取并记录版本号，/api/bots 和 /api/stream 只读内存；
+# 没有订阅者且 idle_after 秒内无人读取时暂停拉取
+class Aggregator:
+    # 比较是否变化时忽略的字段
+    VOLATILE = ("elapsed_ms", "not_modified", "fetched_at")
+
+    def __init__(
+        self,
+        bots: List[BotInfo],
+        timeout: float,
+        pool: ThreadPoolExecutor,
+        cache: SnapshotCache,
+        interval: float,
+        idle_after: float = 60.0,
+    ):
+        self.bots = bots
+        self.timeout = timeout
+        self.pool = pool
+        self.cache = cache
+        self.interval = interval
+        self.idle_after = idle_after
+        # 超过这个时间没有成功拉取就视为过期
+        self.stale_after = interval * 2 + timeout
+        self.version = 0
+        self.updated_at = ""
+        self._cond = threading.Condition()
+        self._items: Dict[str, Dict[str, Any]] = {
+            bot.name: dict(_bot_item(bot, {}, "尚未获取"), fetched_at="") for bot in bots
+        }
+        self._fetched: Dict[str, float] = {}
+        self._versions: Dict[str, int] = {}
+        self._inflight: set = set()
+        self._subscribers = 0
+        # 启动后先拉取一段时间，第一个打开页面的人能直接拿到数据
+        self._last_read = time.monotonic()
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="aggregator", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def refresh(self, name: str = "") -> None:
+        """立即重新拉取指定 bot（不指定则全部），用于定时开关、手动执行之后尽快推送新状态。"""
+        bot = next((b for b in self.bots if b.name == name), None)
+        if bot is not None:
+            self._schedule(bot)
+        else:
+            self._wake.set()
+
+    def _active_locked(self, now: float) -> bool:
+        return self._subscribers > 0 or now - self._last_read < self.idle_after
+
+    def touch(self, subscribers: int = 0) -> None:
+        """记录一次读取（subscribers 为 SSE 订阅数的增减）；空闲中被读取时立即恢复轮询。"""
+        now = time.monotonic()
+        with self._cond:
+            idle = not self._active_locked(now)
+            self._subscribers += subscribers
+            self._last_read = now
+        if idle:
+            self._wake.set()
+
+    def _loop(self) -> None:
+        while True:
+            self._wake.clear()
+            with self._cond:
+                active = self._active_locked(time.monotonic())
+            if not active:
+                self._wake.wait()
+                continue
+            for bot in self.bots:
+                self._schedule(bot)
+            self._wake.wait(self.interval)
+
+    def _schedule(self, bot: BotInfo) -> None:
+        with self._cond:
+            if bot.name in self._inflight:
+                return
+            self._inflight.add(bot.name)
+        try:
+            self.pool.submit(self._fetch, bot)
+        except RuntimeError:
+            with self._cond:
+                self._inflight.discard(bot.name)
+
+    def _fetch(self, bot: BotInfo) -> None:
+        try:
+            item, elapsed = _timed_fetch(bot, self.timeout, self.cache)
+            item["elapsed_ms"] = round(elapsed * 1000, 1)
+            self.store(item)
+        except Exception as e:
+            print(f"[aggregator] {bot.name} 拉取失败: {e}")
+        finally:
+            with self._cond:
+                self._inflight.discard(bot.name)
+
+    def _comparable(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: v for k, v in item.items() if k not in self.VOLATILE}
+
+    def store(self, item: Dict[str, Any]) -> None:
+        name = item["name"]
+        with self._cond:
+            previous = self._items.get(name)
+            if item.get("error") and previous and previous.get("fetched_at"):
+                # 拉取失败时保留上一次成功的数据，只更新错误信息
+                item = dict(previous, error=item["error"], elapsed_ms=item.get("elapsed_ms"))
+            elif item.get("error"):
+                item["fetched_at"] = ""
+            else:
+                item["fetched_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                self._fetched[name] = time.monotonic()
+            self._items[name] = item
+            if previous is None or self._comparable(previous) != self._comparable(item):
+                self.version += 1
+                self._versions[name] = self.version
+                self._cond.notify_all()
+            self.updated_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def _view_locked(self, name: str, now: float) -> Dict[str, Any]:
+        item = dict(self._items[name])
+        fetched = self._fetched.get(name)
+        item["age_s"] = round(now - fetched, 1) if fetched is not None else None
+        item["stale"] = fetched is None or now - fetched > self.stale_after or bool(item.get("error"))
+        item["refreshing"] = name in self._inflight
+        return item
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._cond:
+            return [self._view_locked(bot.name, now) for bot in self.bots]
+
+    def changes(self, since: int, timeout: float) -> Tuple[int, List[Dict[str, Any]]]:
+        """返回版本号大于 since 的 bot；没有变化时最多等待 timeout 秒。"""
+        with self._cond:
+            if self.version <= since:
+                self._cond.wait(timeout)
+            now = time.monotonic()
+            changed = [
+                self._view_locked(bot.name, now) for bot in self.bots if self._versions.get(bot.name, 0) > since
+            ]
+            return self.version, changed
+
+
+def _start_job(bot: BotInfo, payload: Dict[str, Any], timeout: float) -> Tuple[Optional[Any], str]:
+    """提交到 bot 的 /api/jobs 并立即返回任务信息；旧版 bot 没有该接口时回退到同步的 /api/run。"""
+    try:
+        r = requests.post(f"{bot.base_url}/api/jobs", json=payload, timeout=timeout)
+        if r.status_code == HTTPStatus.NOT_FOUND:
+            return _safe_post_json(f"{bot.base_url}/api/run", payload, timeout)
+        r.raise_for_status()
+        return r.json(), ""
+    except Exception as e:
+        return None, str(e)
+
+
+def _plan_bots(
+    bots: List[BotInfo], payload: Dict[str, Any], timeout: float, pool: ThreadPoolExecutor
+) -> Dict[str, Any]:
+    # 读不到配置的 bot 不参与分片，它们的目标由其余 bot 分担
+    if payload.get("clear"):
+        results = pool.map(lambda bot: _safe_post_json(f"{bot.base_url}/api/plan", {"clear": True}, timeout), bots)
+        return {"cleared": [{"name": bot.name, "error": err} for bot, (_, err) in zip(bots, results)]}
+
+    # limit=0：取完整目标列表，而不是默认的第一页；按配置的目标分片，不受上一次计划影响
+    configs = list(pool.map(lambda bot: _safe_get_json(f"{bot.base_url}/api/config?limit=0", timeout), bots))
+    online: Dict[str, Tuple[BotInfo, Dict[str, Any]]] = {}
+    skipped = []
+    for bot, (config, err) in zip(bots, configs):
+        if err or not isinstance(config, dict):
+            skipped.append({"name": bot.name, "error": err or "invalid config"})
+            continue
+        online[bot.name] = (bot, config)
+
+    union: Dict[str, None] = {}
+    for _, config in online.values():
+        # 旧版本 bot 没有 configured_targets 字段，退回 targets
+        configured = config["configured_targets"] if "configured_targets" in config else config.get("targets")
+        union.update(dict.fromkeys(str(x["user_id"] if isinstance(x, dict) else x) for x in configured or []))
+    specs = [
+        {"name": name, "delay": config.get("delay", 0), "daily_targets": config.get("daily_targets", 0)}
+        for name, (_, config) in online.items()
+    ]
+    result = plan_from_payload(payload, specs, union)
+    result["skipped"] = skipped
+    if payload.get("dry_run"):
+        return result
+
+    def push(plan: Dict[str, Any]) -> Tuple[Optional[Any], str]:
+        bot = online[plan["account"]][0]
+        body = {"targets": plan["targets"], "schedule_time": plan["schedule_time"]}
+        return _safe_post_json(f"{bot.base_url}/api/plan", body, timeout)
+
+    for plan, (_, err) in zip(result["plans"], pool.map(push, result["plans"])):
+        plan["pushed"] = not err
+        if err:
+            plan["error"] = err
+    return result
+
+
 def _render_index() -> str:
     return """<!doctype html>
 <html lang="zh-CN">
@@ -94,7 +408,7 @@ def _render_index() -> str:
         <div class="muted">说明：NapCat WebUI 仍需分别登录；这里只统一管理多个 like-bot 的定时开关/手动执行。</div>
       </div>
       <div class="row">
-        <button class="btn secondary" onclick="refreshAll()">刷新</button>
+        <button class="btn secondary" onclick="refreshAll(true)">刷新</button>
       </div>
     </div>
     <div id="meta" class="muted" style="margin-top:10px;"></div>
@@ -115,12 +429,15 @@ def _render_index() -> str:
     return data;
   }
 
-  async function refreshAll() {
+  const known = {};
+
+  async function refreshAll(fresh) {
     const meta = document.getElementById("meta");
     meta.textContent = "加载中...";
     try {
-      const data = await api("/api/bots");
-      meta.textContent = "更新时间：" + (data.now || "");
+      const data = await api(fresh ? "/api/bots?fresh=1" : "/api/bots");
+      meta.textContent = "更新时间：" + (data.now || "") + (data.elapsed_ms != null ? `（耗时 ${data.elapsed_ms} ms）` : "");
+      for (const b of data.bots || []) known[b.name] = b;
       render(data.bots || []);
     } catch (e) {
       meta.textContent = "加载失败：" + e.message;
@@ -138,7 +455,31 @@ def _render_index() -> str:
       grid.innerHTML = `<div class="card"><div class="muted">没有可用的 like-bot（检查 like-manager 的 LIKE_BOTS 配置）。</div></div>`;
       return;
     }
-    grid.innerHTML = bots.map(b => {
+    grid.innerHTML = bots.map(renderCard).join("");
+  }
+
+  function findCard(name) {
+    return Array.from(document.querySelectorAll("#grid .card")).find(el => el.dataset.name === name);
+  }
+
+  // 只替换有变化的卡片，保留输入框里已输入的内容和焦点
+  function updateCards(bots) {
+    for (const b of bots) {
+      const el = findCard(b.name);
+      if (!el) { render(Object.values(known)); return; }
+      const input = el.querySelector("input");
+      const value = input ? input.value : "";
+      const focused = input && document.activeElement === input;
+      el.outerHTML = renderCard(b);
+      const next = findCard(b.name)?.querySelector("input");
+      if (next) {
+        next.value = value;
+        if (focused) next.focus();
+      }
+    }
+  }
+
+  function renderCard(b) {
       const err = b.error || "";
       const state = b.state || {};
       const cfg = b.config || {};
@@ -155,13 +496,15 @@ def _render_index() -> str:
 
       const last = state.last_action_at ? `最近：${state.last_action || ""} @ ${state.last_action_at}（${state.last_action_ok === true ? "成功" : (state.last_action_ok === false ? "失败" : "未知")}）` : "最近：无";
       const next = b.next_run || "";
-      const targets = Array.isArray(cfg.targets) ? cfg.targets.join(", ") : "";
+      const list = Array.isArray(cfg.targets) ? cfg.targets : [];
+      let targets = list.map(t => (t && typeof t === "object") ? t.user_id : t).join(", ");
+      if (cfg.targets_total > list.length) targets += ` …（共 ${cfg.targets_total} 个）`;
       const likeTimes = cfg.like_times ?? "";
       const delay = cfg.delay ?? "";
       const scheduleTime = cfg.schedule_time ?? "";
 
       return `
-        <div class="card">
+        <div class="card" data-name="${esc(b.name)}">
           <div class="row" style="justify-content: space-between;">
             <div class="row">
               <span class="pill mono">${esc(b.name)}</span>
@@ -181,8 +524,10 @@ def _render_index() -> str:
           ${napErr ? `<div class="muted" style="margin-top:8px;">NapCat错误：${esc(napErr)}</div>` : ""}
           <div class="muted" style="margin-top:8px;">${esc(last)}</div>
           <div class="muted" style="margin-top:4px;">下次执行：<span class="mono">${esc(next || "（未知）")}</span></div>
+          ${b.elapsed_ms != null ? `<div class="muted" style="margin-top:4px;">响应耗时：${esc(b.elapsed_ms)} ms</div>` : ""}
+          ${b.fetched_at ? `<div class="muted" style="margin-top:4px;">数据获取于：${esc(b.fetched_at)}${b.stale ? "（已过期）" : ""}</div>` : ""}
           <div class="hr"></div>
-          <div class="muted">TARGET_FRIENDS：</div>
+          <div class="muted">${cfg.targets_file ? "TARGETS_FILE（" + esc(cfg.targets_file) + "）" : "TARGET_FRIENDS"}：</div>
           <div class="pre mono">${esc(targets || "")}</div>
           <div class="muted" style="margin-top:6px;">定时：每天 ${esc(scheduleTime)}；每人 ${esc(likeTimes)} 次；间隔 ${esc(delay)} 秒</div>
           <div class="hr"></div>
@@ -199,7 +544,6 @@ def _render_index() -> str:
           ${state.last_action_detail ? `<div class="muted" style="margin-top:10px;">最近详情：</div><div class="pre mono">${esc(state.last_action_detail)}</div>` : ""}
         </div>
       `;
-    }).join("");
   }
 
   async function toggleSchedule(name, enabled) {
@@ -209,20 +553,30 @@ def _render_index() -> str:
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({ enabled })
       });
-      await refreshAll();
     } catch (e) {
       alert("操作失败：" + e.message);
     }
   }
 
+  async function waitJob(name, job) {
+    // 任务在 bot 上异步执行，轮询进度直到结束
+    const meta = document.getElementById("meta");
+    while (job && job.id && !["done", "failed", "cancelled"].includes(job.status)) {
+      meta.textContent = `${name}：任务 ${job.id} ${job.status}，已处理 ${job.processed ?? 0}/${job.total ?? "?"}`;
+      await new Promise(r => setTimeout(r, 1000));
+      job = await api(`/api/bot/job?name=${encodeURIComponent(name)}&id=${encodeURIComponent(job.id)}`);
+    }
+    if (job && job.status === "failed") throw new Error(job.error || "任务失败");
+  }
+
   async function runNow(name, times) {
     try {
-      await api(`/api/bot/run?name=${encodeURIComponent(name)}`, {
+      const job = await api(`/api/bot/run?name=${encodeURIComponent(name)}`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({ times, reason: "manual" })
       });
-      await refreshAll();
+      await waitJob(name, job);
     } catch (e) {
       alert("操作失败：" + e.message);
     }
@@ -233,19 +587,37 @@ def _render_index() -> str:
     const user_id = (el?.value || "").trim();
     if (!user_id) { alert("请输入QQ号"); return; }
     try {
-      await api(`/api/bot/run?name=${encodeURIComponent(name)}`, {
+      const job = await api(`/api/bot/run?name=${encodeURIComponent(name)}`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({ user_id, times: 1, reason: "manual" })
       });
-      await refreshAll();
+      await waitJob(name, job);
     } catch (e) {
       alert("操作失败：" + e.message);
     }
   }
 
-  refreshAll();
-  setInterval(refreshAll, 15000);
+  function connect() {
+    if (!window.EventSource) {
+      refreshAll();
+      setInterval(refreshAll, 15000);
+      return;
+    }
+    const meta = document.getElementById("meta");
+    meta.textContent = "连接中...";
+    const stream = new EventSource("/api/stream");
+    stream.addEventListener("bots", e => {
+      const data = JSON.parse(e.data);
+      const fresh = (data.bots || []).some(b => !(b.name in known));
+      for (const b of data.bots || []) known[b.name] = b;
+      meta.textContent = "更新时间：" + (data.now || "") + "（实时推送）";
+      if (fresh) render(Object.values(known)); else updateCards(data.bots || []);
+    });
+    stream.onerror = () => { meta.textContent = "推送连接断开，正在重连..."; };
+  }
+
+  connect();
 </script>
 </body>
 </html>
@@ -289,40 +661,112 @@ class Handler(BaseHTTPRequestHandler):
         except Exception:
             return {}
 
+    def _route(self) -> str:
+        path = urlparse(self.path).path
+        return path if path in _ROUTES else "other"
+
     def do_GET(self) -> None:  # noqa: N802
+        with REQUEST_SECONDS.time("GET", self._route()):
+            self._handle_get()
+
+    def do_POST(self) -> None:  # noqa: N802
+        with REQUEST_SECONDS.time("POST", self._route()):
+            self._handle_post()
+
+    def _handle_get(self) -> None:
         path, query = self._get_query()
         if path in {"", "/"}:
             self._send_html(_render_index())
             return
 
-        if path == "/api/bots":
+        if path == "/metrics":
+            self._send(HTTPStatus.OK, "text/plain; version=0.0.4; charset=utf-8", METRICS.render().encode("utf-8"))
+            return
+
+        if path == "/api/stream":
+            self._stream(self.server.aggregator)  # type: ignore[attr-defined]
+            return
+
+        if path == "/api/bot/job":
+            name = (query.get("name", [""])[0] or "").strip()
+            job_id = (query.get("id", [""])[0] or "").strip()
             bots = self.server.bots  # type: ignore[attr-defined]
             timeout = self.server.timeout_s  # type: ignore[attr-defined]
-            out: List[Dict[str, Any]] = []
-            for bot in bots:
-                base = bot.base_url
-                item: Dict[str, Any] = {"name": bot.name, "base_url": base}
-
-                cfg, cfg_err = _safe_get_json(f"{base}/api/config", timeout)
-                state, state_err = _safe_get_json(f"{base}/api/state", timeout)
-                next_run, nr_err = _safe_get_json(f"{base}/api/next_run", timeout)
-                napcat, nap_err = _safe_get_json(f"{base}/api/napcat", timeout)
-
-                item["config"] = cfg or {}
-                item["state"] = state or {}
-                item["next_run"] = (next_run or {}).get("next_run") if isinstance(next_run, dict) else ""
-                item["napcat"] = napcat or {}
-
-                errors = [e for e in [cfg_err, state_err, nr_err, nap_err] if e]
-                item["error"] = "; ".join(errors)
-                out.append(item)
-
-            self._send_json({"now": __import__("datetime").datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "bots": out})
+            target = next((b for b in bots if b.name == name), None)
+            if not target or not job_id:
+                self._send_json({"error": f"Unknown bot or job: {html.escape(name)}"}, HTTPStatus.NOT_FOUND)
+                return
+            data, err = _safe_get_json(f"{target.base_url}/api/jobs/{job_id}", timeout)
+            if err:
+                self._send_json({"error": err}, HTTPStatus.BAD_GATEWAY)
+                return
+            if isinstance(data, dict) and data.get("status") in {"done", "failed", "cancelled"}:
+                self.server.aggregator.refresh(name)  # type: ignore[attr-defined]
+            self._send_json(data)
+            return
+
+        if path == "/api/bots":
+            aggregator = self.server.aggregator  # type: ignore[attr-defined]
+            aggregator.touch()
+            started = time.perf_counter()
+            if (query.get("fresh", [""])[0] or "").strip() in {"1", "true", "yes"}:
+                # 显式要求最新数据时才同步拉取一轮，整体最多等待 MANAGER_DEADLINE 秒
+                bots = self.server.bots  # type: ignore[attr-defined]
+                timeout = self.server.timeout_s  # type: ignore[attr-defined]
+                deadline = self.server.deadline_s  # type: ignore[attr-defined]
+                pool = self.server.pool  # type: ignore[attr-defined]
+                for item in _collect_bots(bots, timeout, deadline, pool, aggregator.cache):
+                    aggregator.store(item)
+            out = aggregator.snapshot()
+            self._send_json(
+                {
+                    "now": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+                    "bots": out,
+                }
+            )
             return
 
         self._send(HTTPStatus.NOT_FOUND, "text/plain; charset=utf-8", b"Not Found")
 
-    def do_POST(self) -> None:  # noqa: N802
+    def _stream(self, aggregator: Aggregator) -> None:
+        # 首次连接推送全部 bot，之后只推送有变化的 bot；断线重连时按 Last-Event-ID 只补发变化
+        try:
+            since = max(0, int(self.headers.get("Last-Event-ID") or 0))
+        except ValueError:
+            since = 0
+        if since > aggregator.version:
+            since = 0
+        self.send_response(HTTPStatus.OK.value)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        aggregator.touch(1)
+        try:
+            while True:
+                version, changed = aggregator.changes(since, 15.0)
+                if changed:
+                    data = json.dumps({"now": aggregator.updated_at, "bots": changed}, ensure_ascii=False)
+                    chunk = f"id: {version}\nevent: bots\ndata: {data}\n\n"
+                    since = version
+                else:
+                    chunk = ": keepalive\n\n"
+                self.wfile.write(chunk.encode("utf-8"))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            return
+        finally:
+            aggregator.touch(-1)
+
+    def _handle_post(self) -> None:
+        try:
+            self._handle_action()
+        finally:
+            # 针对单个 bot 的操作只重新拉取该 bot
+            _, query = self._get_query()
+            self.server.aggregator.refresh((query.get("name", [""])[0] or "").strip())  # type: ignore[attr-defined]
+
+    def _handle_action(self) -> None:
         path, query = self._get_query()
         if path == "/api/bot/toggle_schedule":
             name = (query.get("name", [""])[0] or "").strip()
@@ -350,13 +794,24 @@ class Handler(BaseHTTPRequestHandler):
             if not target:
                 self._send_json({"error": f"Unknown bot: {html.escape(name)}"}, HTTPStatus.NOT_FOUND)
                 return
-            data, err = _safe_post_json(f"{target.base_url}/api/run", payload, timeout)
+            data, err = _start_job(target, payload, timeout)
             if err:
                 self._send_json({"error": err}, HTTPStatus.BAD_GATEWAY)
                 return
             self._send_json(data)
             return
 
+        if path == "/api/plan":
+            payload = self._read_json()
+            bots = self.server.bots  # type: ignore[attr-defined]
+            timeout = self.server.timeout_s  # type: ignore[attr-defined]
+            pool = self.server.pool  # type: ignore[attr-defined]
+            try:
+                self._send_json(_plan_bots(bots, payload, timeout, pool))
+            except ValueError as e:
+                self._send_json({"error": str(e)}, HTTPStatus.BAD_REQUEST)
+            return
+
         self._send(HTTPStatus.NOT_FOUND, "text/plain; charset=utf-8", b"Not Found")
 
 
@@ -364,6 +819,10 @@ def main() -> None:
     host = os.getenv("MANAGER_HOST", "0.0.0.0")
     port = int(os.getenv("MANAGER_PORT", "8090"))
     timeout_s = float(os.getenv("MANAGER_HTTP_TIMEOUT", "5"))
+    deadline_s = float(os.getenv("MANAGER_DEADLINE", str(timeout_s + 1)))
+    workers = int(os.getenv("MANAGER_WORKERS", "16"))
+    interval = float(os.getenv("MANAGER_REFRESH_INTERVAL", "5"))
+    idle_after = float(os.getenv("MANAGER_IDLE_AFTER", "60"))
 
     bots_env = os.getenv("LIKE_BOTS", "")
     bots_list = _parse_bots(bots_env)
@@ -372,6 +831,13 @@ def main() -> None:
     httpd = ThreadingHTTPServer((host, port), Handler)
     httpd.bots = bots  # type: ignore[attr-defined]
     httpd.timeout_s = timeout_s  # type: ignore[attr-defined]
+    httpd.deadline_s = deadline_s  # type: ignore[attr-defined]
+    httpd.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fanout")  # type: ignore[attr-defined]
+    httpd.snapshots = SnapshotCache()  # type: ignore[attr-defined]
+    httpd.aggregator = Aggregator(  # type: ignore[attr-defined]
+        bots, timeout_s, httpd.pool, httpd.snapshots, interval, idle_after  # type: ignore[attr-defined]
+    )
+    httpd.aggregator.start()  # type: ignore[attr-defined]
 
     print("QQLike unified manager started")
     print(f"Listen: http://{host}:{port}")
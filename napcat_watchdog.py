@@ -1,15 +1,25 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import hmac
+import json
 import os
+import threading
 import time
-from dataclasses import dataclass
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
 
 import docker
 import requests
 
+from qq_auto_like_bot import _atomic_write_json
+
 
 def _now_str() -> str:
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -41,6 +51,73 @@ def _parse_items(raw: str) -> List[Tuple[str, str]]:
 class WatchState:
     not_logged_since: Optional[float] = None
     last_restart_at: Optional[float] = None
+    # 本次掉线以来已尝试重启的次数，登录恢复后清零
+    restart_count: int = 0
+    next_attempt_at: Optional[float] = None
+    # 重启次数用完仍未登录：停止重启，等待人工扫码后恢复或通过 /api/reset 清除
+    needs_human: bool = False
+    last_ok_at: Optional[float] = None
+    last_reason: str = ""
+
+
+class WatchStore:
+    """看门狗状态：内存读写，变化后整体写入 WATCHDOG_STATE_FILE（临时文件 + os.replace），重启后恢复。"""
+
+    def __init__(self, path: Optional[str], names: List[str]):
+        self._path = path
+        self.lock = threading.Lock()
+        self.states: Dict[str, WatchState] = {name: WatchState() for name in names}
+        self.probes: Dict[str, Dict[str, Any]] = {}
+        if self._path:
+            self._load()
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(Path(self._path).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"[{_now_str()}] 状态文件读取失败: {e}")
+            return
+        for name, saved in (data.get("states") or {}).items():
+            if name in self.states and isinstance(saved, dict):
+                for key, value in saved.items():
+                    if hasattr(self.states[name], key):
+                        setattr(self.states[name], key, value)
+
+    def save(self) -> None:
+        if not self._path:
+            return
+        with self.lock:
+            data = {"states": {k: asdict(v) for k, v in self.states.items()}}
+        try:
+            _atomic_write_json(self._path, data)
+        except Exception as e:
+            print(f"[{_now_str()}] 状态文件写入失败: {e}")
+
+    def view(self, items: List[Tuple[str, str]], restarter: "Restarter") -> Dict[str, Any]:
+        with self.lock:
+            out = []
+            for bot_service, container in items:
+                st = self.states[bot_service]
+                if st.needs_human:
+                    status = "needs_human"
+                elif restarter.busy(container):
+                    status = "restarting"
+                elif st.not_logged_since is not None:
+                    status = "not_logged_in"
+                else:
+                    status = "ok"
+                out.append(
+                    dict(
+                        asdict(st),
+                        bot=bot_service,
+                        container=container,
+                        status=status,
+                        probe=self.probes.get(bot_service, {}),
+                    )
+                )
+        return {"now": _now_str(), "items": out}
 
 
 def _is_logged_in(napcat_payload: Dict) -> bool:
@@ -58,65 +135,243 @@ def _is_logged_in(napcat_payload: Dict) -> bool:
     return bool(user_id)
 
 
+def _probe(bot_service: str, timeout: float) -> Tuple[bool, str, float]:
+    url = f"http://{bot_service}:8080/api/napcat"
+    started = time.perf_counter()
+    payload: Any = None
+    err = ""
+    try:
+        r = requests.get(url, timeout=timeout)
+        r.raise_for_status()
+        payload = r.json()
+    except Exception as e:
+        err = str(e)
+    latency = time.perf_counter() - started
+    if not err and _is_logged_in(payload):
+        return True, "", latency
+    reason = payload.get("error") if isinstance(payload, dict) and payload.get("error") else (err or "not logged in")
+    return False, str(reason), latency
+
+
+# 在独立线程池里重启容器，不阻塞探测；同一个容器同时只有一个重启
+class Restarter:
+    def __init__(self, client: "docker.DockerClient", workers: int):
+        self._client = client
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="restart")
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+
+    def busy(self, container_name: str) -> bool:
+        with self._lock:
+            return container_name in self._inflight
+
+    def submit(self, bot_service: str, container_name: str, on_done: Callable[[bool], None]) -> bool:
+        with self._lock:
+            if container_name in self._inflight:
+                return False
+            self._inflight[container_name] = self._pool.submit(self._restart, bot_service, container_name, on_done)
+            return True
+
+    def _restart(self, bot_service: str, container_name: str, on_done: Callable[[bool], None]) -> None:
+        started = time.perf_counter()
+        ok = False
+        try:
+            container = self._client.containers.get(container_name)
+            container.restart(timeout=20)
+            ok = True
+            print(f"[{_now_str()}] {bot_service}: restarted {container_name} in {time.perf_counter() - started:.1f}s")
+        except Exception as e:
+            print(f"[{_now_str()}] {bot_service}: restart failed: {e}")
+        finally:
+            with self._lock:
+                self._inflight.pop(container_name, None)
+            on_done(ok)
+
+
+def _backoff(relogin_delay: float, attempt: int, max_delay: float) -> float:
+    return min(max_delay, relogin_delay * (2 ** max(0, attempt - 1)))
+
+
+def _make_status_handler(
+    store: WatchStore, items: List[Tuple[str, str]], restarter: "Restarter", token: str = ""
+) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        server_version = "NapCatWatchdog/1.0"
+
+        def log_message(self, fmt: str, *args: Any) -> None:
+            pass
+
+        def _send_json(self, obj: Any, status: HTTPStatus = HTTPStatus.OK) -> None:
+            body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+            self.send_response(status.value)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self) -> None:  # noqa: N802
+            if urlparse(self.path).path in {"/", "/api/status"}:
+                self._send_json(store.view(items, restarter))
+                return
+            self._send_json({"error": "Not Found"}, HTTPStatus.NOT_FOUND)
+
+        def do_POST(self) -> None:  # noqa: N802
+            parsed = urlparse(self.path)
+            if parsed.path != "/api/reset":
+                self._send_json({"error": "Not Found"}, HTTPStatus.NOT_FOUND)
+                return
+            query = parse_qs(parsed.query)
+            # 配置了 WATCHDOG_TOKEN 时，重置需带 X-Admin-Token 头或 ?token=（与 like-bot 管理接口一致）
+            given = (self.headers.get("X-Admin-Token") or query.get("token", [""])[0] or "").strip()
+            if token and not hmac.compare_digest(given.encode("utf-8"), token.encode("utf-8")):
+                self._send_json({"error": "Unauthorized"}, HTTPStatus.UNAUTHORIZED)
+                return
+            bot = (query.get("bot", [""])[0] or "").strip()
+            with store.lock:
+                st = store.states.get(bot)
+                if st is None:
+                    self._send_json({"error": f"Unknown bot: {bot}"}, HTTPStatus.NOT_FOUND)
+                    return
+                # 重新给一轮重启预算，并立即允许下一次尝试
+                st.needs_human = False
+                st.restart_count = 0
+                st.next_attempt_at = None
+            store.save()
+            print(f"[{_now_str()}] {bot}: reset by /api/reset")
+            self._send_json(store.view(items, restarter))
+
+    return Handler
+
+
 def main() -> None:
     watch_items = _parse_items(os.getenv("WATCH_ITEMS", "like-bot1|napcat_account1"))
     check_interval = float(os.getenv("CHECK_INTERVAL", "30"))
     relogin_delay = float(os.getenv("RELOGIN_DELAY", "300"))  # 5 minutes
     http_timeout = float(os.getenv("HTTP_TIMEOUT", "5"))
+    cycle_deadline = float(os.getenv("CYCLE_DEADLINE", str(http_timeout + 1)))
+    probe_workers = int(os.getenv("PROBE_WORKERS", str(min(32, max(1, len(watch_items))))))
+    restart_workers = int(os.getenv("RESTART_WORKERS", "2"))
+    restart_budget = int(os.getenv("RESTART_BUDGET", "3"))
+    backoff_max = float(os.getenv("RESTART_BACKOFF_MAX", "3600"))
+    status_port = int(os.getenv("WATCHDOG_PORT", "8091"))
+    status_host = (os.getenv("WATCHDOG_HOST") or "").strip() or "127.0.0.1"
+    status_token = (os.getenv("WATCHDOG_TOKEN") or "").strip()
+    state_file = (os.getenv("WATCHDOG_STATE_FILE") or "").strip() or None
 
     client = docker.DockerClient(base_url=os.getenv("DOCKER_HOST", "unix:///var/run/docker.sock"))
 
-    states: Dict[str, WatchState] = {bot: WatchState() for bot, _ in watch_items}
+    store = WatchStore(state_file, [bot for bot, _ in watch_items])
+    probes = ThreadPoolExecutor(max_workers=max(1, probe_workers), thread_name_prefix="probe")
+    restarter = Restarter(client, restart_workers)
+    if status_port > 0:
+        if status_host not in {"127.0.0.1", "localhost", "::1"} and not status_token:
+            print(f"[{_now_str()}] 警告：状态接口监听 {status_host} 且未设置 WATCHDOG_TOKEN，任何能访问的人都可以调用 /api/reset")
+        httpd = ThreadingHTTPServer(
+            (status_host, status_port), _make_status_handler(store, watch_items, restarter, status_token)
+        )
+        threading.Thread(target=httpd.serve_forever, name="status", daemon=True).start()
+    # 上一轮还没返回的探测不重复提交，本轮按超时处理
+    pending: Dict[str, Future] = {}
 
     print(f"[{_now_str()}] napcat_watchdog started")
     print(f"[{_now_str()}] WATCH_ITEMS={','.join([f'{b}|{c}' for b, c in watch_items])}")
     print(f"[{_now_str()}] CHECK_INTERVAL={check_interval}s RELLOGIN_DELAY={relogin_delay}s HTTP_TIMEOUT={http_timeout}s")
+    print(f"[{_now_str()}] CYCLE_DEADLINE={cycle_deadline}s PROBE_WORKERS={probe_workers} RESTART_WORKERS={restart_workers}")
+    print(f"[{_now_str()}] RESTART_BUDGET={restart_budget} RESTART_BACKOFF_MAX={backoff_max}s WATCHDOG={status_host}:{status_port}")
 
     while True:
         loop_started = time.time()
+        for bot_service, _ in watch_items:
+            if bot_service not in pending:
+                pending[bot_service] = probes.submit(_probe, bot_service, http_timeout)
+        wait(list(pending.values()), timeout=cycle_deadline)
+
+        results: Dict[str, Tuple[bool, str, float]] = {}
+        for bot_service, _ in watch_items:
+            fut = pending[bot_service]
+            if fut.done():
+                del pending[bot_service]
+                results[bot_service] = fut.result()
+            else:
+                results[bot_service] = (False, f"probe timeout after {cycle_deadline:g}s", time.time() - loop_started)
+        print(
+            f"[{_now_str()}] probe: "
+            + ", ".join(
+                f"{bot}={'ok' if ok else 'fail'} {latency * 1000:.0f}ms" for bot, (ok, _, latency) in results.items()
+            )
+        )
+
+        with store.lock:
+            for bot_service, (ok, reason, latency) in results.items():
+                store.probes[bot_service] = {
+                    "ok": ok,
+                    "reason": reason,
+                    "latency_ms": round(latency * 1000, 1),
+                    "at": _now_str(),
+                }
+
+        dirty = False
         for bot_service, napcat_container in watch_items:
-            url = f"http://{bot_service}:8080/api/napcat"
-            st = states.setdefault(bot_service, WatchState())
-            ok = False
-            err = ""
-            payload = None
-            try:
-                r = requests.get(url, timeout=http_timeout)
-                r.raise_for_status()
-                payload = r.json()
-                ok = _is_logged_in(payload)
-            except Exception as e:
-                err = str(e)
-                ok = False
-
-            if ok:
-                if st.not_logged_since is not None:
-                    print(f"[{_now_str()}] {bot_service}: login ok again; clear timer")
-                st.not_logged_since = None
-                continue
-
-            now = time.time()
-            if st.not_logged_since is None:
-                st.not_logged_since = now
-                reason = payload.get("error") if isinstance(payload, dict) else err
-                print(f"[{_now_str()}] {bot_service}: not logged in; start 5min timer ({reason})")
-                continue
-
-            elapsed = now - st.not_logged_since
-            if elapsed < relogin_delay:
-                continue
+            ok, reason, _ = results[bot_service]
+            with store.lock:
+                st = store.states[bot_service]
+                now = time.time()
+                if ok:
+                    if st.not_logged_since is not None or st.needs_human:
+                        print(f"[{_now_str()}] {bot_service}: login ok again; clear timer")
+                        st.not_logged_since = None
+                        st.restart_count = 0
+                        st.next_attempt_at = None
+                        st.needs_human = False
+                        st.last_reason = ""
+                        dirty = True
+                    st.last_ok_at = now
+                    continue
+
+                st.last_reason = reason
+                if st.not_logged_since is None:
+                    st.not_logged_since = now
+                    st.next_attempt_at = now + relogin_delay
+                    dirty = True
+                    print(f"[{_now_str()}] {bot_service}: not logged in; start {int(relogin_delay)}s timer ({reason})")
+                    continue
+
+                if st.needs_human or restarter.busy(napcat_container):
+                    continue
+                if st.next_attempt_at is not None and now < st.next_attempt_at:
+                    continue
+                if st.restart_count >= restart_budget:
+                    st.needs_human = True
+                    dirty = True
+                    print(
+                        f"[{_now_str()}] {bot_service}: {st.restart_count} restarts did not restore login; "
+                        "needs manual re-login, stop restarting"
+                    )
+                    continue
+
+                st.restart_count += 1
+                attempt = st.restart_count
+                elapsed = now - st.not_logged_since
+                dirty = True
+
+            def on_done(restarted: bool, st: WatchState = st, attempt: int = attempt) -> None:
+                with store.lock:
+                    finished = time.time()
+                    if restarted:
+                        st.last_restart_at = finished
+                    # 无论成败都按指数退避推迟下一次尝试，避免重启风暴拖垮同机的其他账号
+                    st.next_attempt_at = finished + _backoff(relogin_delay, attempt + 1, backoff_max)
+                store.save()
 
             # Try restart napcat container as "relogin attempt"
-            try:
-                print(f"[{_now_str()}] {bot_service}: try restart {napcat_container} (elapsed={int(elapsed)}s)")
-                container = client.containers.get(napcat_container)
-                container.restart(timeout=20)
-                st.last_restart_at = now
-                st.not_logged_since = now  # reset timer: next attempt after another relogin_delay
-            except Exception as e:
-                print(f"[{_now_str()}] {bot_service}: restart failed: {e}")
-                # avoid tight loop on repeated failures
-                st.not_logged_since = now
+            print(
+                f"[{_now_str()}] {bot_service}: try restart {napcat_container} "
+                f"(elapsed={int(elapsed)}s, attempt {attempt}/{restart_budget})"
+            )
+            restarter.submit(bot_service, napcat_container, on_done)
+
+        if dirty:
+            store.save()
 
         spent = time.time() - loop_started
         sleep_s = max(1.0, check_interval - spent)
@@ -125,4 +380,3 @@ def main() -> None:
 
 if __name__ == "__main__":
     main()
-
@@ -8,21 +8,35 @@ QQ名片自动点赞机器人
 - 管理页面（按钮触发点赞一次 + 开关控制是否执行定时点赞）
 """
 
+import asyncio
+import bisect
+import hashlib
+import heapq
+import hmac
 import html
+import itertools
 import json
 import os
+import random
+import signal
+import sqlite3
 import threading
 import time
-from dataclasses import asdict, dataclass
-from datetime import datetime
+import uuid
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, timedelta
 from http import HTTPStatus
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
-from urllib.parse import parse_qs, quote, urlparse
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from urllib.parse import parse_qs, quote, unquote, urlparse
 
 import requests
-import schedule
+import websocket
+from requests.adapters import HTTPAdapter
 
 
 def _now_str() -> str:
@@ -45,17 +59,882 @@ def _safe_int_env(name: str, default: int) -> int:
         raise ValueError(f"{name} 必须是整数，当前: {raw!r}") from e
 
 
+def _safe_float_env(name: str, default: float) -> float:
+    raw = os.getenv(name)
+    if raw is None or raw.strip() == "":
+        return default
+    try:
+        return float(raw)
+    except ValueError as e:
+        raise ValueError(f"{name} 必须是数字，当前: {raw!r}") from e
+
+
+def _atomic_write_json(path: str, data: Any, indent: Optional[int] = 2) -> None:
+    # 先写临时文件并 fsync，再 os.replace，断电或崩溃时不会留下写了一半的文件
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f".{target.name}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, target)
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], le: str = "") -> str:
+    pairs = list(zip(names, values))
+    if le:
+        pairs.append(("le", le))
+    parts = []
+    for name, value in pairs:
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{name}="{escaped}"')
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        # 锁内只做一次字典加法，热路径开销可以忽略
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_format_labels(self.labelnames, k)} {v:g}" for k, v in values]
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # 每组标签：[各桶计数..., +Inf 计数, 总和]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(labels)
+            if row is None:
+                row = self._values[labels] = [0.0] * (len(self.buckets) + 2)
+            row[idx] += 1
+            row[-1] += value
+
+    def time(self, *labels: str) -> "_Timer":
+        return _Timer(self, labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted((k, list(v)) for k, v in self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, row in values:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, row):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, f'{bound:g}')} {cumulative:g}")
+            cumulative += row[len(self.buckets)]
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, '+Inf')} {cumulative:g}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {row[-1]:g}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative:g}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Tuple[str, ...]):
+        self._histogram = histogram
+        self._labels = labels
+        self._started = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._histogram.observe(time.perf_counter() - self._started, *self._labels)
+
+
+class Gauge:
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        lines += [f"{self.name}{_format_labels(self.labelnames, k)} {v:g}" for k, v in values]
+        return lines
+
+
+class Metrics:
+    """Prometheus 文本格式的指标注册表。"""
+
+    def __init__(self) -> None:
+        self._metrics: List[Any] = []
+
+    def counter(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        metric = Gauge(name, help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+ONEBOT_SECONDS = METRICS.histogram(
+    "qqlike_onebot_request_seconds", "OneBot action latency in seconds", ("account", "action")
+)
+ONEBOT_ERRORS = METRICS.counter(
+    "qqlike_onebot_errors_total", "OneBot actions that raised a transport error", ("account", "action")
+)
+SEND_LIKE_TOTAL = METRICS.counter("qqlike_send_like_total", "send_like outcomes", ("account", "result"))
+RUN_SECONDS = METRICS.histogram("qqlike_run_seconds", "Like run duration in seconds", ("account", "reason"))
+RUNS_TOTAL = METRICS.counter("qqlike_runs_total", "Like runs by outcome", ("account", "reason", "result"))
+SEND_LIKE_RETRIES = METRICS.counter(
+    "qqlike_send_like_retries_total", "send_like retries after transient failures", ("account",)
+)
+ADMIN_SECONDS = METRICS.histogram(
+    "qqlike_admin_request_seconds", "Admin HTTP request handling time in seconds", ("method", "route")
+)
+JOB_QUEUE_DEPTH = METRICS.gauge("qqlike_job_queue_depth", "Like jobs waiting in the queue", ("account", "kind"))
+JOB_WAIT_SECONDS = METRICS.histogram(
+    "qqlike_job_wait_seconds", "Time like jobs spent queued before starting", ("account", "kind")
+)
+
+
+@dataclass
+class RetryPolicy:
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+
+    def backoff(self, attempt: int) -> float:
+        # full jitter：在 [0, base * 2^attempt] 内随机，避免多个请求同时重试
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2**attempt)))
+
+
+# 连续 failure_threshold 次传输错误后熔断，reset_timeout 秒后由一个请求用 get_status 探测恢复
+class CircuitBreaker:
+    def __init__(self, probe: Callable[[], bool], failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self._probe = probe
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._trips = 0
+
+    def is_open(self) -> bool:
+        with self._lock:
+            return self._opened_at is not None and (
+                self._probing or time.monotonic() - self._opened_at < self.reset_timeout
+            )
+
+    def probe_due(self) -> bool:
+        """allow() 这次调用是否会同步执行探测请求。"""
+        with self._lock:
+            return (
+                self._opened_at is not None
+                and not self._probing
+                and time.monotonic() - self._opened_at >= self.reset_timeout
+            )
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probing or time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self._probing = True
+        try:
+            healthy = self._probe()
+        except Exception:
+            healthy = False
+        with self._lock:
+            self._probing = False
+            if healthy:
+                self._opened_at = None
+                self._failures = 0
+                print(f"[{_now_str()}] NapCat 探测成功，恢复发送")
+            else:
+                self._opened_at = time.monotonic()
+        return healthy
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._opened_at is None and self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._trips += 1
+                print(f"[{_now_str()}] NapCat 连续失败 {self._failures} 次，暂停发送 {self.reset_timeout:g}s")
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            if self._opened_at is None:
+                state = "closed"
+            elif self._probing or time.monotonic() - self._opened_at < self.reset_timeout:
+                state = "open"
+            else:
+                state = "half_open"
+            return {"state": state, "consecutive_failures": self._failures, "trips": self._trips}
+
+
+# AIMD：成功且延迟达标时加性提速，限流 / 传输错误时乘性降速
+class AdaptivePacer:
+    def __init__(
+        self,
+        delay: float,
+        min_delay: float,
+        max_delay: float,
+        target_latency: float = 1.0,
+        increase: float = 0.05,
+        decrease: float = 0.5,
+    ):
+        self.min_delay = max(0.01, min_delay)
+        self.max_delay = max(self.min_delay, max_delay)
+        self.target_latency = target_latency
+        self.increase = increase
+        self.decrease = decrease
+        self._lock = threading.Lock()
+        self._rate = self._clamp(1.0 / delay if delay > 0 else 1.0 / self.min_delay)
+        self._ok = 0
+        self._backoffs = 0
+
+    def _clamp(self, rate: float) -> float:
+        return min(1.0 / self.min_delay, max(1.0 / self.max_delay, rate))
+
+    @property
+    def rate(self) -> float:
+        with self._lock:
+            return self._rate
+
+    @property
+    def delay(self) -> float:
+        return 1.0 / self.rate
+
+    def observe(self, ok: bool, latency: float, congested: bool) -> None:
+        with self._lock:
+            if congested:
+                self._rate = self._clamp(self._rate * self.decrease)
+                self._backoffs += 1
+            elif latency > self.target_latency:
+                self._rate = self._clamp(self._rate * 0.9)
+            elif ok:
+                self._rate = self._clamp(self._rate + self.increase)
+                self._ok += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "rate_per_s": round(self._rate, 3),
+                "delay_s": round(1.0 / self._rate, 3),
+                "min_delay_s": self.min_delay,
+                "max_delay_s": self.max_delay,
+                "target_latency_s": self.target_latency,
+                "backoffs": self._backoffs,
+            }
+
+
+class _TokenBucket:
+    """按速率发放令牌的限速器；rate <= 0 表示不限速。"""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+# 点赞目标：QQ 号，或 (QQ 号, 本次点赞次数)
+LikeTarget = Union[str, Tuple[str, int]]
+# 每次 send_like 完成后的回调：(QQ 号, 次数, 是否成功, NapCat 返回)
+LikeCallback = Callable[[str, int, bool, Dict[str, Any]], None]
+
+
+def _like_target(item: LikeTarget, default_times: int) -> Tuple[str, int]:
+    if isinstance(item, tuple):
+        return str(item[0]), int(item[1])
+    return str(item), default_times
+
+
+# 目标文件：每行一个 QQ 号或一条 JSONL；每次迭代从头流式读取，文件修改后无需重启
+class TargetSource:
+    def __init__(self, path: str, tags: Optional[Iterable[str]] = None):
+        self.path = path
+        self.tags = frozenset(tags or ())
+        self._lock = threading.Lock()
+        # None 表示文件不存在；_checked 为 False 时还没有统计过
+        self._stamp: Optional[Tuple[float, int]] = None
+        self._checked = False
+        self._count = 0
+        self._invalid = 0
+
+    def with_tags(self, tags: Iterable[str]) -> "TargetSource":
+        return TargetSource(self.path, tags)
+
+    @staticmethod
+    def _user_id(value: Any) -> str:
+        user_id = str(value).strip()
+        if not user_id.isdigit():
+            raise ValueError(f"不是 QQ 号: {user_id!r}")
+        return user_id
+
+    @classmethod
+    def _parse_line(cls, line: str) -> Optional[Dict[str, Any]]:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            return None
+        if line.startswith("{"):
+            data = json.loads(line)
+            entry: Dict[str, Any] = {"user_id": cls._user_id(data["user_id"])}
+            if data.get("times"):
+                entry["times"] = max(1, min(int(data["times"]), 10))
+            entry["tags"] = [str(t) for t in data.get("tags") or []]
+            return entry
+        return {"user_id": cls._user_id(line.split("#", 1)[0]), "tags": []}
+
+    def entries(self) -> Iterator[Dict[str, Any]]:
+        invalid = 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = self._parse_line(line)
+                    except (ValueError, KeyError, TypeError):
+                        invalid += 1
+                        continue
+                    if entry is None or (self.tags and not self.tags.intersection(entry["tags"])):
+                        continue
+                    yield entry
+        except FileNotFoundError:
+            # 文件不存在时按空列表处理，提示由 _refresh_stats 在状态变化时输出一次
+            pass
+        self._invalid = invalid
+
+    def __iter__(self) -> Iterator[LikeTarget]:
+        for entry in self.entries():
+            yield (entry["user_id"], entry["times"]) if entry.get("times") else entry["user_id"]
+
+    def _refresh_stats(self) -> None:
+        # 只在文件 mtime / 大小变化时重新计数
+        try:
+            st = os.stat(self.path)
+            stamp: Optional[Tuple[float, int]] = (st.st_mtime, st.st_size)
+        except FileNotFoundError:
+            stamp = None
+        with self._lock:
+            if self._checked and stamp == self._stamp:
+                return
+            count = sum(1 for _ in self.entries())
+            if stamp is None:
+                print(f"[targets] 目标文件不存在: {self.path}")
+            elif self._checked:
+                print(f"[targets] 目标文件已更新：{count} 个目标，{self._invalid} 行无法解析")
+            self._stamp, self._count, self._checked = stamp, count, True
+
+    def __len__(self) -> int:
+        self._refresh_stats()
+        return self._count
+
+    def page(self, offset: int, limit: int) -> List[Dict[str, Any]]:
+        return list(itertools.islice(self.entries(), offset, offset + limit if limit > 0 else None))
+
+    def stats(self) -> Dict[str, Any]:
+        self._refresh_stats()
+        return {"path": self.path, "count": self._count, "invalid": self._invalid, "tags": sorted(self.tags)}
+
+
+Targets = Union[List[str], TargetSource]
+
+
+def _target_ids(targets: Iterable[LikeTarget]) -> Iterator[str]:
+    for item in targets:
+        yield _like_target(item, 0)[0]
+
+
+def _targets_page(targets: Targets, offset: int, limit: int) -> List[Any]:
+    if isinstance(targets, TargetSource):
+        # 没有 times / tags 的条目直接显示为 QQ 号，与 TARGET_FRIENDS 的格式一致
+        return [
+            entry if entry.get("times") or entry.get("tags") else entry["user_id"]
+            for entry in targets.page(offset, limit)
+        ]
+    return list(targets[offset : offset + limit] if limit > 0 else targets[offset:])
+
+
+# 根据 OneBot 心跳 / 生命周期事件维护登录状态，超过两个心跳周期没有事件视为过期
+class LoginStateTracker:
+    DEFAULT_INTERVAL = 30.0
+
+    def __init__(self, name: str = "default"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._self_id: Optional[str] = None
+        self._nickname = ""
+        self._online: Optional[bool] = None
+        self._good: Optional[bool] = None
+        self._interval = self.DEFAULT_INTERVAL
+        self._last_event: Optional[float] = None
+        self._last_event_at = ""
+        self._source = ""
+        self._events = 0
+
+    def observe(self, event: Any, source: str) -> None:
+        if not isinstance(event, dict) or "post_type" not in event:
+            return
+        with self._lock:
+            was_online = self._online
+            self._events += 1
+            self._source = source
+            self._last_event = time.monotonic()
+            self._last_event_at = _now_str()
+            self_id = event.get("self_id")
+            if self_id and str(self_id) != self._self_id:
+                self._self_id = str(self_id)
+                self._nickname = ""
+            if event.get("post_type") != "meta_event":
+                return
+            kind = event.get("meta_event_type")
+            if kind == "heartbeat":
+                status = event.get("status") or {}
+                self._online = status.get("online") is not False
+                self._good = status.get("good")
+                try:
+                    self._interval = max(1.0, float(event["interval"]) / 1000)
+                except (KeyError, TypeError, ValueError):
+                    pass
+            elif kind == "lifecycle":
+                # NapCat 登录成功后才会启动 OneBot 服务，enable / connect 即说明已登录
+                self._online = event.get("sub_type") != "disable"
+            online = self._online
+        if was_online is not None and online != was_online:
+            print(f"[{_now_str()}] [{self.name}] NapCat 事件：QQ {'已上线' if online else '已离线'}（{source}）")
+
+    def remember_login(self, login_info: Optional[Dict[str, Any]]) -> None:
+        """记下主动查询到的昵称，事件里只有 self_id。"""
+        data = (login_info or {}).get("data")
+        if not isinstance(data, dict) or not data.get("user_id"):
+            return
+        with self._lock:
+            if self._self_id in {None, str(data["user_id"])}:
+                self._self_id = str(data["user_id"])
+                self._nickname = str(data.get("nickname") or "")
+
+    def _fresh_locked(self, now: float) -> bool:
+        return self._last_event is not None and self._online is not None and now - self._last_event < self._interval * 2
+
+    def fresh(self) -> bool:
+        with self._lock:
+            return self._fresh_locked(time.monotonic())
+
+    def snapshot(self) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]], str]:
+        """返回与 get_status / get_login_info 相同格式的结果，以及错误信息。"""
+        with self._lock:
+            status = {"status": "ok", "retcode": 0, "data": {"online": self._online, "good": self._good}}
+            if not self._online or not self._self_id:
+                return status, None, "QQ 已离线（来自 NapCat 心跳事件）"
+            user_id: Any = int(self._self_id) if self._self_id.isdigit() else self._self_id
+            login = {"status": "ok", "retcode": 0, "data": {"user_id": user_id, "nickname": self._nickname}}
+            return status, login, ""
+
+    def view(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "fresh": self._fresh_locked(now),
+                "source": self._source,
+                "events": self._events,
+                "last_event_at": self._last_event_at,
+                "age_s": round(now - self._last_event, 1) if self._last_event is not None else None,
+                "interval_s": self._interval,
+                "online": self._online,
+                "self_id": self._self_id,
+            }
+
+
+def _verify_signature(secret: str, body: bytes, signature: str) -> bool:
+    # OneBot 11 HTTP 上报的签名：X-Signature: sha1=<HMAC-SHA1(secret, body)>
+    expected = "sha1=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha1).hexdigest()
+    return hmac.compare_digest(expected, (signature or "").strip())
+
+
+class HttpTransport:
+    """每个 OneBot 动作一次 HTTP POST，复用 keep-alive 连接池，避免每次请求重新握手。"""
+
+    kind = "http"
+
+    def __init__(self, api_url: str, headers: Dict[str, str], timeout: Tuple[float, float], pool_size: int = 4):
+        self.api_url = api_url.rstrip("/")
+        self.timeout = timeout
+        self.pool_size = max(1, int(pool_size))
+        self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, pool_block=False)
+        self._session = requests.Session()
+        self._session.headers.update(headers)
+        self._session.mount("http://", self._adapter)
+        self._session.mount("https://", self._adapter)
+        # submit() 用的线程按需创建，实际在途数由调用方的窗口（LIKE_CONCURRENCY）控制
+        self._executor = ThreadPoolExecutor(max_workers=max(16, self.pool_size), thread_name_prefix="onebot-http")
+
+    def call(self, action: str, params: Dict[str, Any], timeout: Optional[Tuple[float, float]] = None) -> Dict[str, Any]:
+        response = self._session.post(f"{self.api_url}/{action}", json=params, timeout=timeout or self.timeout)
+        # 5xx 视为传输错误（计入熔断），4xx 仍按 OneBot 返回体处理
+        if response.status_code >= 500:
+            response.raise_for_status()
+        return response.json()
+
+    def submit(self, action: str, params: Dict[str, Any]) -> "Future[Dict[str, Any]]":
+        return self._executor.submit(self.call, action, params)
+
+    def stats(self) -> Dict[str, Any]:
+        opened = 0
+        pooled_requests = 0
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            opened += getattr(pool, "num_connections", 0)
+            pooled_requests += getattr(pool, "num_requests", 0)
+        return {
+            "pool_size": self.pool_size,
+            "connections_opened": opened,
+            "connections_reused": max(0, pooled_requests - opened),
+        }
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+        self._session.close()
+
+
+# 常驻 WebSocket 连接：请求带 echo 发出，由读线程按 echo 分发响应，多个请求可以同时在途
+class WebSocketTransport:
+    kind = "ws"
+
+    def __init__(
+        self,
+        ws_url: str,
+        headers: Dict[str, str],
+        timeout: Tuple[float, float],
+        name: str = "default",
+        backoff: Optional[RetryPolicy] = None,
+        on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ):
+        self.ws_url = ws_url
+        self.on_event = on_event
+        self.timeout = timeout
+        self.name = name
+        self._headers = [f"{k}: {v}" for k, v in headers.items() if k.lower() == "authorization"]
+        self._backoff = backoff or RetryPolicy(base_delay=0.5, max_delay=30.0)
+        self._send_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._pending: Dict[str, "Future[Dict[str, Any]]"] = {}
+        self._seq = itertools.count(1)
+        self._ws: Optional[websocket.WebSocket] = None
+        self._connected = threading.Event()
+        self._closed = threading.Event()
+        self._connects = 0
+        self._last_error = ""
+        self._thread = threading.Thread(target=self._run, name=f"ws-{name}", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        failures = 0
+        while not self._closed.is_set():
+            try:
+                ws = websocket.create_connection(self.ws_url, timeout=self.timeout[0], header=self._headers)
+            except Exception as e:
+                failures += 1
+                self._last_error = str(e)
+                pause = self._backoff.backoff(failures)
+                print(f"[ws] [{self.name}] 连接 {self.ws_url} 失败，{pause:.1f}s 后重试: {e}")
+                self._closed.wait(pause)
+                continue
+            # 读线程一直阻塞在 recv 上，超时由各个请求自己控制
+            ws.settimeout(None)
+            failures = 0
+            self._last_error = ""
+            with self._lock:
+                self._ws = ws
+                self._connects += 1
+            self._connected.set()
+            if self._connects > 1:
+                print(f"[ws] [{self.name}] 已重新连接 {self.ws_url}")
+            try:
+                self._read(ws)
+            except Exception as e:
+                self._last_error = str(e)
+                if not self._closed.is_set():
+                    print(f"[ws] [{self.name}] 连接断开: {e}")
+            finally:
+                self._connected.clear()
+                with self._lock:
+                    self._ws = None
+                    pending, self._pending = self._pending, {}
+                for future in pending.values():
+                    future.set_exception(ConnectionError("WebSocket 连接已断开"))
+                try:
+                    ws.close()
+                except Exception:
+                    pass
+
+    def _read(self, ws: "websocket.WebSocket") -> None:
+        while not self._closed.is_set():
+            raw = ws.recv()
+            if not raw:
+                raise ConnectionError("WebSocket 连接已关闭")
+            try:
+                message = json.loads(raw)
+            except ValueError:
+                continue
+            # 不带 echo 的是 OneBot 上报的事件（心跳、生命周期等）
+            echo = message.pop("echo", None) if isinstance(message, dict) else None
+            if echo is None:
+                if self.on_event is not None:
+                    self.on_event(message)
+                continue
+            with self._lock:
+                future = self._pending.pop(str(echo), None)
+            if future is not None:
+                future.set_result(message)
+
+    def _send(self, action: str, params: Dict[str, Any], connect_timeout: float) -> Tuple[str, "Future[Dict[str, Any]]"]:
+        if not (self._connected.is_set() if connect_timeout <= 0 else self._connected.wait(connect_timeout)):
+            raise ConnectionError(f"WebSocket 未连接: {self._last_error or self.ws_url}")
+        echo = f"{self.name}-{next(self._seq)}"
+        future: "Future[Dict[str, Any]]" = Future()
+        with self._lock:
+            ws = self._ws
+            if ws is None:
+                raise ConnectionError("WebSocket 未连接")
+            self._pending[echo] = future
+        try:
+            with self._send_lock:
+                ws.send(json.dumps({"action": action, "params": params, "echo": echo}, ensure_ascii=False))
+        except Exception:
+            self._forget(echo)
+            raise
+        return echo, future
+
+    def _forget(self, echo: str) -> None:
+        with self._lock:
+            self._pending.pop(echo, None)
+
+    def call(self, action: str, params: Dict[str, Any], timeout: Optional[Tuple[float, float]] = None) -> Dict[str, Any]:
+        connect_timeout, read_timeout = timeout or self.timeout
+        echo, future = self._send(action, params, connect_timeout)
+        try:
+            return future.result(read_timeout)
+        except FutureTimeout:
+            raise TimeoutError(f"{action} 等待响应超时（{read_timeout}s）") from None
+        finally:
+            self._forget(echo)
+
+    def submit(self, action: str, params: Dict[str, Any]) -> "Future[Dict[str, Any]]":
+        # 会在事件循环里调用：未连接时不等待重连，直接失败交给重试 / 熔断处理
+        try:
+            echo, future = self._send(action, params, 0)
+        except Exception as e:
+            failed: "Future[Dict[str, Any]]" = Future()
+            failed.set_exception(e)
+            return failed
+        timer = threading.Timer(self.timeout[1], self._expire, (echo, action))
+        timer.daemon = True
+        timer.start()
+        future.add_done_callback(lambda _: timer.cancel())
+        return future
+
+    def _expire(self, echo: str, action: str) -> None:
+        with self._lock:
+            future = self._pending.pop(echo, None)
+        if future is not None:
+            future.set_exception(TimeoutError(f"{action} 等待响应超时（{self.timeout[1]}s）"))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "ws_url": self.ws_url,
+            "connected": self._connected.is_set(),
+            "connects": self._connects,
+            "in_flight": pending,
+            "last_error": self._last_error,
+        }
+
+    def close(self) -> None:
+        self._closed.set()
+        with self._lock:
+            ws = self._ws
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+
+
 class QQAutoLikeBot:
-    def __init__(self, api_url: str, access_token: Optional[str] = None):
+    def __init__(
+        self,
+        api_url: str,
+        access_token: Optional[str] = None,
+        pool_size: int = 4,
+        connect_timeout: float = 3.0,
+        read_timeout: float = 10.0,
+        name: str = "default",
+        retry: Optional[RetryPolicy] = None,
+        breaker_threshold: int = 5,
+        breaker_reset: float = 30.0,
+        transport: str = "http",
+        ws_url: str = "",
+    ):
+        self.name = name
+        self.retry = retry or RetryPolicy()
+        self.breaker = CircuitBreaker(self._probe, breaker_threshold, breaker_reset)
         self.api_url = api_url.rstrip("/")
         self.headers = {"Content-Type": "application/json"}
         if access_token:
             self.headers["Authorization"] = f"Bearer {access_token}"
+        self.timeout: Tuple[float, float] = (connect_timeout, read_timeout)
+        self.pool_size = max(1, int(pool_size))
+        self.events = LoginStateTracker(name)
+
+        self.transport: Union[HttpTransport, WebSocketTransport]
+        if transport == "ws":
+            if not ws_url:
+                raise ValueError(f"账号 {name!r} 使用 WebSocket 传输但没有配置 NAPCAT_WS_URL / ws_url")
+            self.transport = WebSocketTransport(
+                ws_url, self.headers, self.timeout, name=name, on_event=lambda event: self.events.observe(event, "ws")
+            )
+        elif transport == "http":
+            self.transport = HttpTransport(self.api_url, self.headers, self.timeout, self.pool_size)
+        else:
+            raise ValueError(f"NAPCAT_TRANSPORT 只能是 http 或 ws，当前: {transport!r}")
+
+        self._stats_lock = threading.Lock()
+        self._requests = 0
+        self._errors = 0
+
+    def _post(
+        self,
+        action: str,
+        params: Optional[Dict[str, Any]] = None,
+        timeout: Optional[Tuple[float, float]] = None,
+    ) -> Dict[str, Any]:
+        action = action.lstrip("/")
+        with self._stats_lock:
+            self._requests += 1
+        started = time.perf_counter()
+        try:
+            return self.transport.call(action, params or {}, timeout)
+        except Exception:
+            with self._stats_lock:
+                self._errors += 1
+            ONEBOT_ERRORS.inc(self.name, action)
+            raise
+        finally:
+            ONEBOT_SECONDS.observe(time.perf_counter() - started, self.name, action)
+
+    def _post_future(self, action: str, params: Optional[Dict[str, Any]] = None) -> "Future[Dict[str, Any]]":
+        """与 _post 相同，但经由传输层的流水线发出，立即返回 Future。"""
+        action = action.lstrip("/")
+        with self._stats_lock:
+            self._requests += 1
+        started = time.perf_counter()
+        future = self.transport.submit(action, params or {})
+
+        def done(f: "Future[Dict[str, Any]]") -> None:
+            ONEBOT_SECONDS.observe(time.perf_counter() - started, self.name, action)
+            if f.exception() is not None:
+                with self._stats_lock:
+                    self._errors += 1
+                ONEBOT_ERRORS.inc(self.name, action)
+
+        future.add_done_callback(done)
+        return future
+
+    def transport_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            total, errors = self._requests, self._errors
+        return dict(
+            self.transport.stats(),
+            transport=self.transport.kind,
+            connect_timeout=self.timeout[0],
+            read_timeout=self.timeout[1],
+            requests=total,
+            errors=errors,
+        )
 
-    def _post(self, action: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        url = f"{self.api_url}/{action.lstrip('/')}"
-        response = requests.post(url, headers=self.headers, json=params or {}, timeout=10)
-        return response.json()
+    def close(self) -> None:
+        self.transport.close()
 
     def get_login_info(self) -> Dict[str, Any]:
         return self._post("get_login_info")
@@ -63,22 +942,118 @@ class QQAutoLikeBot:
     def get_status(self) -> Dict[str, Any]:
         return self._post("get_status")
 
+    def _probe(self) -> bool:
+        result = self._post("get_status")
+        ok = result.get("status") == "ok" or result.get("retcode") == 0
+        return ok and (result.get("data") or {}).get("online") is not False
+
+    # NapCat 限流时的 retcode / 提示字样，视为可重试
+    THROTTLE_RETCODES = {1429}
+    THROTTLE_MARKERS = ("频繁", "too frequent", "rate limit")
+
+    @classmethod
+    def is_throttled(cls, result: Dict[str, Any]) -> bool:
+        if result.get("retcode") in cls.THROTTLE_RETCODES:
+            return True
+        text = f"{result.get('message', '')} {result.get('wording', '')}".lower()
+        return any(marker in text for marker in cls.THROTTLE_MARKERS)
+
+    @classmethod
+    def is_congested(cls, result: Dict[str, Any]) -> bool:
+        # 限流或传输错误（连不上 / 超时）说明应当降速；熔断跳过的不算
+        if result.get("circuit_open"):
+            return False
+        return "error" in result or cls.is_throttled(result)
+
     def send_like(self, user_id: str, times: int = 10) -> bool:
+        return self.send_like_result(user_id, times)[0]
+
+    def send_like_result(
+        self, user_id: str, times: int = 10, deadline: Optional[float] = None
+    ) -> Tuple[bool, Dict[str, Any]]:
+        # 传输错误和限流按指数退避重试，不超过 deadline（time.monotonic() 时间）
+        like_times = self._like_times(times)
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                return self._circuit_open()
+            try:
+                result = self._post("send_like", {"user_id": user_id, "times": like_times})
+                ok, result = self._like_verdict(user_id, like_times, result)
+            except Exception as e:
+                ok, result = self._like_error(e)
+            if ok is not None:
+                return ok, result
+            attempt += 1
+            pause = self._retry_pause(attempt, deadline)
+            if pause is None:
+                return False, result
+            time.sleep(pause)
+
+    async def send_like_result_async(
+        self, user_id: str, times: int = 10, deadline: Optional[float] = None
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """send_like_result 的协程版本：请求经 _post_future 发出，等待响应时不占用线程。"""
+        like_times = self._like_times(times)
+        attempt = 0
+        while True:
+            # 只有需要探测时 allow() 才会发请求，放到线程里避免阻塞事件循环
+            allowed = await asyncio.to_thread(self.breaker.allow) if self.breaker.probe_due() else self.breaker.allow()
+            if not allowed:
+                return self._circuit_open()
+            future = self._post_future("send_like", {"user_id": user_id, "times": like_times})
+            try:
+                ok, result = self._like_verdict(user_id, like_times, await asyncio.wrap_future(future))
+            except Exception as e:
+                ok, result = self._like_error(e)
+            if ok is not None:
+                return ok, result
+            attempt += 1
+            pause = self._retry_pause(attempt, deadline)
+            if pause is None:
+                return False, result
+            await asyncio.sleep(pause)
+
+    @staticmethod
+    def _like_times(times: Any) -> int:
         try:
-            like_times = max(1, min(int(times), 10))
+            return max(1, min(int(times), 10))
         except Exception:
-            like_times = 1
-
-        try:
-            result = self._post("send_like", {"user_id": user_id, "times": like_times})
-            if result.get("status") == "ok" or result.get("retcode") == 0:
-                print(f"✓ 成功给 {user_id} 点赞 {like_times} 次")
-                return True
-            print(f"✗ 给 {user_id} 点赞失败: {result}")
-            return False
-        except Exception as e:
-            print(f"✗ 请求失败: {e}")
-            return False
+            return 1
+
+    def _circuit_open(self) -> Tuple[bool, Dict[str, Any]]:
+        SEND_LIKE_TOTAL.inc(self.name, "circuit_open")
+        return False, {"error": "NapCat 不可用（熔断中），跳过", "circuit_open": True}
+
+    def _like_error(self, error: BaseException) -> Tuple[Optional[bool], Dict[str, Any]]:
+        print(f"✗ 请求失败: {error}")
+        self.breaker.record_failure()
+        return None, {"error": str(error)}
+
+    def _like_verdict(self, user_id: str, like_times: int, result: Dict[str, Any]) -> Tuple[Optional[bool], Dict[str, Any]]:
+        """返回 (ok, result)，ok 为 None 表示限流，应当重试。"""
+        if result.get("status") == "ok" or result.get("retcode") == 0:
+            self.breaker.record_success()
+            print(f"✓ 成功给 {user_id} 点赞 {like_times} 次")
+            SEND_LIKE_TOTAL.inc(self.name, "ok")
+            return True, result
+        print(f"✗ 给 {user_id} 点赞失败: {result}")
+        # NapCat 有响应说明连接正常；限流只退避重试并由 pacer 降速，不计入熔断
+        self.breaker.record_success()
+        if self.is_throttled(result):
+            return None, result
+        SEND_LIKE_TOTAL.inc(self.name, "fail")
+        return False, result
+
+    def _retry_pause(self, attempt: int, deadline: Optional[float]) -> Optional[float]:
+        """瞬时失败后的退避时间；不再重试时返回 None。"""
+        pause = self.retry.backoff(attempt)
+        out_of_time = deadline is not None and time.monotonic() + pause > deadline
+        if attempt >= self.retry.max_attempts or out_of_time or self.breaker.is_open():
+            SEND_LIKE_TOTAL.inc(self.name, "error")
+            return None
+        SEND_LIKE_RETRIES.inc(self.name)
+        return pause
 
     def get_friend_list(self) -> List[Dict[str, Any]]:
         try:
@@ -91,27 +1066,509 @@ class QQAutoLikeBot:
             print(f"✗ 请求失败: {e}")
             return []
 
-    def auto_like_friends(self, friend_ids: List[str], times: int = 10, delay: int = 2) -> Dict[str, int]:
+    def fetch_friend_ids(self) -> List[str]:
+        """与 get_friend_list 不同，失败时抛出异常，避免把失败当成“没有好友”。"""
+        result = self._post("get_friend_list", {})
+        if result.get("status") == "ok" or result.get("retcode") == 0:
+            return [str(f["user_id"]) for f in result.get("data") or [] if isinstance(f, dict) and f.get("user_id")]
+        raise RuntimeError(f"获取好友列表失败: {result}")
+
+    def auto_like_friends(
+        self,
+        friend_ids: Iterable[LikeTarget],
+        times: int = 10,
+        delay: int = 2,
+        on_result: Optional[LikeCallback] = None,
+        deadline: Optional[float] = None,
+        pacer: Optional[AdaptivePacer] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> Dict[str, Any]:
         print(f"\n{'=' * 50}")
         print(f"开始自动点赞任务 - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         print(f"{'=' * 50}\n")
 
         success_count = 0
         fail_count = 0
-
-        for idx, user_id in enumerate(friend_ids):
-            if self.send_like(user_id, times):
+        results: List[Dict[str, Any]] = []
+        started = time.perf_counter()
+
+        for idx, item in enumerate(friend_ids):
+            if idx and not self.breaker.is_open():
+                pause = pacer.delay if pacer else delay
+                if cancel is not None:
+                    cancel.wait(pause)
+                else:
+                    time.sleep(pause)
+            if cancel is not None and cancel.is_set():
+                break
+            user_id, like_times = _like_target(item, times)
+            sent_at = time.perf_counter()
+            ok, result = self.send_like_result(user_id, like_times, deadline)
+            latency = time.perf_counter() - sent_at
+            latency_ms = round(latency * 1000, 1)
+            if pacer:
+                pacer.observe(ok, latency, self.is_congested(result))
+            results.append({"user_id": user_id, "times": like_times, "ok": ok, "latency_ms": latency_ms})
+            if on_result:
+                on_result(user_id, like_times, ok, result)
+            if ok:
                 success_count += 1
             else:
                 fail_count += 1
 
-            if idx != len(friend_ids) - 1:
-                time.sleep(delay)
+        print(f"\n{'=' * 50}")
+        print(f"点赞任务完成！成功: {success_count}, 失败: {fail_count}")
+        print(f"{'=' * 50}\n")
+        return {
+            "success": success_count,
+            "fail": fail_count,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+            "cancelled": bool(cancel is not None and cancel.is_set()),
+            "results": results,
+        }
+
+    async def auto_like_friends_async(
+        self,
+        friend_ids: Iterable[LikeTarget],
+        times: int = 10,
+        delay: float = 2,
+        concurrency: int = 4,
+        on_result: Optional[LikeCallback] = None,
+        deadline: Optional[float] = None,
+        pacer: Optional[AdaptivePacer] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> Dict[str, Any]:
+        # DELAY 作为发送速率而不是固定 sleep，最多 concurrency 个请求同时在途；results 按发送顺序排列
+        print(f"\n{'=' * 50}")
+        print(f"开始自动点赞任务（异步） - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        print(f"{'=' * 50}\n")
+
+        window = max(1, int(concurrency))
+        bucket = _TokenBucket(rate=1.0 / delay if delay and delay > 0 else 0.0)
+        slots = asyncio.Semaphore(window)
+        results: List[Dict[str, Any]] = []
+        in_flight = 0
+        peak = 0
+        started = time.perf_counter()
+
+        async def like_one(entry: Dict[str, Any]) -> None:
+            nonlocal in_flight
+            sent_at = time.perf_counter()
+            try:
+                ok, result = await self.send_like_result_async(entry["user_id"], entry["times"], deadline)
+                entry["ok"] = ok
+                if pacer:
+                    pacer.observe(ok, time.perf_counter() - sent_at, self.is_congested(result))
+                if on_result:
+                    on_result(entry["user_id"], entry["times"], ok, result)
+            finally:
+                entry["latency_ms"] = round((time.perf_counter() - sent_at) * 1000, 1)
+                in_flight -= 1
+                slots.release()
+
+        tasks = []
+        for item in friend_ids:
+            user_id, like_times = _like_target(item, times)
+            await slots.acquire()
+            if not self.breaker.is_open():
+                # 熔断时请求会立即失败，不必占用发送速率
+                if pacer:
+                    bucket.rate = pacer.rate
+                await bucket.acquire()
+            if cancel is not None and cancel.is_set():
+                slots.release()
+                break
+            entry: Dict[str, Any] = {"user_id": user_id, "times": like_times, "ok": False, "latency_ms": None}
+            results.append(entry)
+            in_flight += 1
+            peak = max(peak, in_flight)
+            tasks.append(asyncio.create_task(like_one(entry)))
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        success_count = sum(1 for r in results if r["ok"])
+        fail_count = len(results) - success_count
 
         print(f"\n{'=' * 50}")
         print(f"点赞任务完成！成功: {success_count}, 失败: {fail_count}")
         print(f"{'=' * 50}\n")
-        return {"success": success_count, "fail": fail_count}
+        return {
+            "success": success_count,
+            "fail": fail_count,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+            "cancelled": bool(cancel is not None and cancel.is_set()),
+            "window": window,
+            "peak_in_flight": peak,
+            "results": results,
+        }
+
+
+class _Flight:
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+# TTL 缓存，过期后并发请求只触发一次上游调用（single-flight）；异常不缓存
+class TTLCache:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[float, Any]] = {}
+        self._inflight: Dict[str, _Flight] = {}
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+
+    def get(self, key: str, loader: Callable[[], Any], fresh: bool = False) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if not fresh and entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self._hits += 1
+                return entry[1]
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._inflight[key] = flight
+                self._misses += 1
+            else:
+                self._coalesced += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+            with self._lock:
+                self._entries[key] = (time.monotonic(), flight.value)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.event.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ttl": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "coalesced": self._coalesced,
+                "size": len(self._entries),
+            }
+
+
+# 好友列表缓存：落盘后重启可直接使用，刷新失败时保留旧数据
+class FriendIndex:
+    RETRY_AFTER = 60.0
+
+    def __init__(self, loader: Callable[[], List[str]], path: Optional[str], ttl: float):
+        self._loader = loader
+        self._path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._ids: frozenset = frozenset()
+        self._refreshed_at = 0.0
+        self._failed_at = 0.0
+        self._error = ""
+        if self._path:
+            self._load()
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(Path(self._path).read_text(encoding="utf-8"))
+            self._ids = frozenset(str(x) for x in data.get("user_ids") or [])
+            self._refreshed_at = float(data.get("refreshed_at") or 0)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[friends] 好友缓存读取失败: {e}")
+
+    def _save(self) -> None:
+        _atomic_write_json(self._path, {"refreshed_at": self._refreshed_at, "user_ids": sorted(self._ids)}, indent=None)
+
+    def _expired(self) -> bool:
+        now = time.time()
+        # NapCat 不可用时不要让每次执行都阻塞在 get_friend_list 上
+        if now - self._failed_at < min(self.ttl, self.RETRY_AFTER):
+            return False
+        return now - self._refreshed_at >= self.ttl
+
+    def refresh(self) -> None:
+        started = (self._refreshed_at, self._failed_at)
+        with self._refresh_lock:
+            if (self._refreshed_at, self._failed_at) != started:
+                # 等锁期间别的线程已经刷新（或刚失败）过
+                return
+            try:
+                ids = frozenset(self._loader())
+            except Exception as e:
+                self._error = str(e)
+                self._failed_at = time.time()
+                print(f"[friends] 刷新好友列表失败，继续使用缓存: {e}")
+                return
+            with self._lock:
+                self._ids = ids
+                self._refreshed_at = time.time()
+                self._failed_at = 0.0
+                self._error = ""
+            if self._path:
+                try:
+                    self._save()
+                except Exception as e:
+                    print(f"[friends] 好友缓存写入失败: {e}")
+
+    def ids(self, refresh: bool = False) -> frozenset:
+        if refresh or self._expired():
+            self.refresh()
+        with self._lock:
+            return self._ids
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "count": len(self._ids),
+                "refreshed_at": (
+                    datetime.fromtimestamp(self._refreshed_at).strftime("%Y-%m-%d %H:%M:%S") if self._refreshed_at else ""
+                ),
+                "age_s": round(time.time() - self._refreshed_at, 1) if self._refreshed_at else None,
+                "ttl": self.ttl,
+                "error": self._error,
+            }
+
+
+# 点赞流水记入 SQLite，内存里维护当天各目标已成功的次数
+class LikeLedger:
+    # NapCat 在当天点赞次数用完时返回的提示里包含这些字样（如“今日同一好友点赞数已达上限”）
+    QUOTA_MARKERS = ("上限", "次数已用完")
+
+    def __init__(self, path: Optional[str], retention_days: int = 30):
+        self._path = path
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path or ":memory:", check_same_thread=False)
+        # record() 在每次 send_like 后调用（异步引擎里在事件循环上），
+        # WAL + synchronous=NORMAL 下提交只追加 WAL、不做 fsync；进程崩溃不丢数据，断电最多丢最后几条
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS likes ("
+            " account TEXT NOT NULL, target TEXT NOT NULL, day TEXT NOT NULL,"
+            " times INTEGER NOT NULL, ok INTEGER NOT NULL, exhausted INTEGER NOT NULL, at TEXT NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS likes_day ON likes (day, account, target)")
+        self._db.commit()
+        self._day = ""
+        self._used: Dict[Tuple[str, str], int] = {}
+        self._exhausted: set = set()
+        with self._lock:
+            self._roll_locked()
+
+    def _roll_locked(self) -> None:
+        today = datetime.now().strftime("%Y-%m-%d")
+        if today == self._day:
+            return
+        self._day = today
+        self._used = {}
+        self._exhausted = set()
+        rows = self._db.execute(
+            "SELECT account, target, SUM(CASE WHEN ok THEN times ELSE 0 END), MAX(exhausted)"
+            " FROM likes WHERE day = ? GROUP BY account, target",
+            (today,),
+        ).fetchall()
+        for account, target, used, exhausted in rows:
+            self._used[(account, target)] = int(used or 0)
+            if exhausted:
+                self._exhausted.add((account, target))
+        if self.retention_days > 0:
+            cutoff = datetime.fromtimestamp(time.time() - self.retention_days * 86400).strftime("%Y-%m-%d")
+            self._db.execute("DELETE FROM likes WHERE day < ?", (cutoff,))
+            self._db.commit()
+
+    @classmethod
+    def is_quota_error(cls, result: Dict[str, Any]) -> bool:
+        text = f"{result.get('message', '')} {result.get('wording', '')}".lower()
+        return any(marker in text for marker in cls.QUOTA_MARKERS)
+
+    def record(self, account: str, target: str, times: int, ok: bool, result: Dict[str, Any]) -> None:
+        # 限流重试用完也是失败，但不代表当天次数已用完
+        exhausted = (not ok) and self.is_quota_error(result) and not QQAutoLikeBot.is_throttled(result)
+        with self._lock:
+            self._roll_locked()
+            key = (account, target)
+            if ok:
+                self._used[key] = self._used.get(key, 0) + times
+            if exhausted:
+                self._exhausted.add(key)
+            self._db.execute(
+                "INSERT INTO likes (account, target, day, times, ok, exhausted, at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (account, target, self._day, times, int(ok), int(exhausted), _now_str()),
+            )
+            self._db.commit()
+
+    def remaining(self, account: str, target: str, quota: int) -> int:
+        with self._lock:
+            self._roll_locked()
+            key = (account, target)
+            if key in self._exhausted:
+                return 0
+            return max(0, quota - self._used.get(key, 0))
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+# 最近的记录在内存环形缓冲里（只有汇总），完整记录追加到按大小滚动的 JSONL 分段；
+# id 不小于结束时间的毫秒数，按时间过滤时可以跳过整段旧文件
+class RunHistory:
+    def __init__(
+        self,
+        directory: Optional[str],
+        ring_size: int = 200,
+        segment_bytes: int = 1024 * 1024,
+        max_segments: int = 500,
+    ):
+        self._dir = Path(directory) if directory else None
+        self._lock = threading.Lock()
+        self._ring: Deque[Dict[str, Any]] = deque(maxlen=max(1, ring_size))
+        self.segment_bytes = segment_bytes
+        self.max_segments = max_segments
+        self._last_id = 0
+        self._segment: Optional[Path] = None
+        if self._dir:
+            try:
+                self._dir.mkdir(parents=True, exist_ok=True)
+                self._load()
+            except Exception as e:
+                print(f"[history] 历史记录读取失败: {e}")
+
+    def _segments(self) -> List[Tuple[int, Path]]:
+        if not self._dir:
+            return []
+        out = []
+        for path in self._dir.glob("runs-*.jsonl"):
+            try:
+                out.append((int(path.stem.split("-", 1)[1]), path))
+            except ValueError:
+                continue
+        return sorted(out)
+
+    @staticmethod
+    def _summary(record: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: v for k, v in record.items() if k != "results"}
+
+    @staticmethod
+    def _read_segment(path: Path) -> List[Dict[str, Any]]:
+        records = []
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        continue  # 写到一半的最后一行
+        except FileNotFoundError:
+            pass
+        return records
+
+    def _load(self) -> None:
+        segments = self._segments()
+        if not segments:
+            return
+        self._segment = segments[-1][1]
+        recent: List[Dict[str, Any]] = []
+        for _, path in reversed(segments):
+            recent = self._read_segment(path) + recent
+            if len(recent) >= self._ring.maxlen:
+                break
+        for record in recent[-self._ring.maxlen :]:
+            self._ring.append(self._summary(record))
+        if recent:
+            self._last_id = int(recent[-1].get("id", 0))
+
+    def _append_disk_locked(self, record: Dict[str, Any]) -> None:
+        if not self._dir:
+            return
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        if self._segment is None or (
+            self._segment.exists() and self._segment.stat().st_size + len(line) > self.segment_bytes
+        ):
+            self._segment = self._dir / f"runs-{record['id']}.jsonl"
+            segments = self._segments()
+            for _, old in segments[: max(0, len(segments) + 1 - self.max_segments)]:
+                old.unlink(missing_ok=True)
+        with open(self._segment, "a", encoding="utf-8") as f:
+            f.write(line)
+
+    def append(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self._last_id = max(self._last_id + 1, int(time.time() * 1000))
+            record = dict(record, id=self._last_id)
+            self._ring.append(self._summary(record))
+            try:
+                self._append_disk_locked(record)
+            except Exception as e:
+                print(f"[history] 历史记录写入失败: {e}")
+            return record
+
+    def query(self, since: float = 0.0, limit: int = 20, cursor: Optional[int] = None) -> Dict[str, Any]:
+        """按时间倒序返回 ended_ts >= since 的记录；cursor 为上一页返回的 next_cursor。"""
+        since_ms = since * 1000
+        items: List[Dict[str, Any]] = []
+
+        def scan(records: Iterable[Dict[str, Any]], upper: Optional[int]) -> bool:
+            # 返回 True 表示已经取满或已越过 since，不需要再看更旧的记录
+            for record in records:
+                if upper is not None and record["id"] >= upper:
+                    continue
+                if record["id"] < since_ms:
+                    return True
+                if record.get("ended_ts", 0) * 1000 >= since_ms:
+                    items.append(self._summary(record))
+                    if len(items) >= limit:
+                        return True
+            return False
+
+        with self._lock:
+            ring = list(self._ring)
+        done = scan(reversed(ring), cursor)
+        if not done and self._dir:
+            # 内存里没有的更早记录从分段文件里找，只读与查询范围重叠的分段
+            bounds = [x for x in (cursor, ring[0]["id"] if ring else None) if x is not None]
+            upper = min(bounds) if bounds else None
+            for first_id, path in reversed(self._segments()):
+                if upper is not None and first_id >= upper:
+                    continue
+                if scan(reversed(self._read_segment(path)), upper):
+                    break
+
+        next_cursor = items[-1]["id"] if len(items) >= limit else None
+        return {"items": items, "next_cursor": next_cursor}
+
+    def detail(self, record_id: int) -> Optional[Dict[str, Any]]:
+        """按 id 返回完整记录（含每个目标的 results）；没有分段文件时只有汇总。"""
+        for first_id, path in reversed(self._segments()):
+            if first_id <= record_id:
+                for record in self._read_segment(path):
+                    if record.get("id") == record_id:
+                        return record
+                break
+        with self._lock:
+            return next((record for record in self._ring if record["id"] == record_id), None)
 
 
 @dataclass
@@ -121,13 +1578,20 @@ class BotState:
     last_action_at: str = ""
     last_action_ok: Optional[bool] = None
     last_action_detail: str = ""
+    plan_targets: Optional[List[str]] = None
+    plan_schedule_time: str = ""
 
 
+# 修改只改内存，flush_delay 秒内的多次修改合并成一次落盘
 class StateStore:
-    def __init__(self, path: Optional[str], initial: BotState):
+    def __init__(self, path: Optional[str], initial: BotState, flush_delay: float = 1.0):
         self._path = path
         self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
         self._state = initial
+        self._dirty = False
+        self._timer: Optional[threading.Timer] = None
+        self.flush_delay = flush_delay
         if self._path:
             self._load()
 
@@ -140,22 +1604,45 @@ class StateStore:
                     if hasattr(self._state, key):
                         setattr(self._state, key, value)
         except FileNotFoundError:
-            self._save_locked()
+            self._dirty = True
+            self.flush()
         except Exception as e:
             print(f"[admin] 状态文件读取失败: {e}")
 
-    def _save_locked(self) -> None:
+    def _schedule_flush_locked(self) -> None:
         if not self._path:
+            self._dirty = False
             return
-        path = Path(self._path)
-        try:
-            path.parent.mkdir(parents=True, exist_ok=True)
-            path.write_text(
-                json.dumps(asdict(self._state), ensure_ascii=False, indent=2),
-                encoding="utf-8",
-            )
-        except Exception as e:
-            print(f"[admin] 状态文件写入失败: {e}")
+        if self._timer is not None:
+            return
+        self._timer = threading.Timer(self.flush_delay, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def flush(self) -> None:
+        if not self._path:
+            return
+        # _flush_lock 保证多次落盘按顺序进行，旧快照不会覆盖新快照
+        with self._flush_lock:
+            with self._lock:
+                self._timer = None
+                if not self._dirty:
+                    return
+                data = asdict(self._state)
+                self._dirty = False
+            try:
+                _atomic_write_json(self._path, data)
+            except Exception as e:
+                print(f"[admin] 状态文件写入失败: {e}")
+                with self._lock:
+                    self._dirty = True
+
+    def close(self) -> None:
+        with self._lock:
+            timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
+        self.flush()
 
     def get(self) -> BotState:
         with self._lock:
@@ -166,50 +1653,711 @@ class StateStore:
             for key, value in kwargs.items():
                 if hasattr(self._state, key):
                     setattr(self._state, key, value)
-            self._save_locked()
-            return BotState(**asdict(self._state))
+            self._dirty = True
+            if self.flush_delay > 0:
+                self._schedule_flush_locked()
+            state = BotState(**asdict(self._state))
+        if self.flush_delay <= 0:
+            self.flush()
+        return state
+
+
+def _result_error(result: Dict[str, Any]) -> str:
+    return str(result.get("error") or result.get("wording") or result.get("message") or "")
+
+
+class LikeJob:
+    """一次点赞任务：逐个目标记录结果事件，供 /api/jobs 查询进度和 SSE 推送。"""
+
+    FINISHED = ("done", "failed", "cancelled")
+
+    def __init__(self, user_ids: "Targets", times: int, reason: str, force: bool, priority: Optional[int] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.user_ids = user_ids
+        self.times = times
+        self.reason = reason
+        self.force = force
+        # 单目标任务走交互通道，可与批量任务并行；数值越小越先执行，手动任务默认优先于定时任务
+        self.kind = "interactive" if len(user_ids) <= 1 else "bulk"
+        self.priority = priority if priority is not None else (0 if reason == "manual" else 1)
+        self.queued_at = time.monotonic()
+        self.wait_s: Optional[float] = None
+        self.status = "queued"
+        self.total = len(user_ids)
+        self.success = 0
+        self.fail = 0
+        self.skipped = 0
+        self.created_at = _now_str()
+        self.started_at = ""
+        self.ended_at = ""
+        self.error = ""
+        self.summary: Optional[Dict[str, Any]] = None
+        self.events: List[Dict[str, Any]] = []
+        self.cancel_event = threading.Event()
+        self._cond = threading.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in self.FINISHED
+
+    def add_event(self, user_id: str, times: int, ok: bool, result: Dict[str, Any]) -> None:
+        with self._cond:
+            if ok:
+                self.success += 1
+            else:
+                self.fail += 1
+            event = {"id": len(self.events) + 1, "user_id": user_id, "times": times, "ok": ok}
+            if not ok:
+                event["error"] = _result_error(result)
+            self.events.append(event)
+            self._cond.notify_all()
+
+    def start(self) -> None:
+        with self._cond:
+            self.status = "running"
+            self.started_at = _now_str()
+            self.wait_s = time.monotonic() - self.queued_at
+
+    def finish(self, status: str, summary: Optional[Dict[str, Any]] = None, error: str = "") -> None:
+        with self._cond:
+            self.status = status
+            self.summary = summary
+            self.error = error
+            self.ended_at = _now_str()
+            self._cond.notify_all()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        with self._cond:
+            return self._cond.wait_for(lambda: self.finished, timeout)
+
+    def events_after(self, last_id: int, timeout: float) -> Tuple[List[Dict[str, Any]], bool]:
+        """返回 id 大于 last_id 的事件；没有新事件时最多等待 timeout 秒。"""
+        with self._cond:
+            if len(self.events) <= last_id and not self.finished:
+                self._cond.wait(timeout)
+            return self.events[last_id:], self.finished
+
+    def view(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "id": self.id,
+                "status": self.status,
+                "kind": self.kind,
+                "priority": self.priority,
+                "reason": self.reason,
+                "times": self.times,
+                "total": self.total,
+                "processed": len(self.events),
+                "success": self.success,
+                "fail": self.fail,
+                "skipped": self.skipped,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "ended_at": self.ended_at,
+                "wait_ms": round(self.wait_s * 1000, 1) if self.wait_s is not None else None,
+                "error": self.error,
+            }
+
+
+class JobQueueFull(RuntimeError):
+    pass
+
+
+# 交互任务和批量任务分开排队，同一时间最多执行一个批量任务
+class JobQueue:
+    KINDS = ("interactive", "bulk")
+
+    def __init__(
+        self,
+        runner: Callable[[LikeJob], None],
+        name: str = "jobs",
+        keep: int = 50,
+        maxsize: int = 100,
+        workers: int = 2,
+    ):
+        self._runner = runner
+        self._name = name
+        self._keep = keep
+        self.maxsize = max(1, maxsize)
+        # 至少两个 worker，否则交互任务无法与批量任务并行
+        self._workers = max(2, workers)
+        self._cond = threading.Condition()
+        self._queues: Dict[str, List[Tuple[int, int, LikeJob]]] = {kind: [] for kind in self.KINDS}
+        self._running: Dict[str, int] = {kind: 0 for kind in self.KINDS}
+        self._seq = itertools.count()
+        self._jobs: Dict[str, LikeJob] = {}
+        self._threads: List[threading.Thread] = []
+        self._closed = False
+
+    def _publish_locked(self) -> None:
+        for kind, queue in self._queues.items():
+            JOB_QUEUE_DEPTH.set(len(queue), self._name, kind)
+
+    def submit(self, job: LikeJob) -> LikeJob:
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("任务队列已关闭")
+            # 两类任务分别计数，批量任务排满时不影响单目标的手动点赞
+            if len(self._queues[job.kind]) >= self.maxsize:
+                raise JobQueueFull(f"任务队列已满（{self.maxsize}），请稍后再试")
+            self._jobs[job.id] = job
+            heapq.heappush(self._queues[job.kind], (job.priority, next(self._seq), job))
+            self._trim_locked()
+            self._publish_locked()
+            if len(self._threads) < self._workers:
+                thread = threading.Thread(target=self._loop, name=f"{self._name}-{len(self._threads)}", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            self._cond.notify_all()
+        return job
+
+    def _trim_locked(self) -> None:
+        # 只保留最近 keep 个已结束的任务，排队和执行中的任务不受影响
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[: max(0, len(finished) - self._keep)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[LikeJob]:
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[LikeJob]:
+        with self._cond:
+            return list(self._jobs.values())
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._cond:
+            waiting = [entry[2] for queue in self._queues.values() for entry in queue]
+            return {
+                "depth": {kind: len(queue) for kind, queue in self._queues.items()},
+                "running": dict(self._running),
+                "max": self.maxsize,
+                "workers": self._workers,
+                "oldest_wait_s": round(max((now - job.queued_at for job in waiting), default=0.0), 3),
+            }
+
+    def cancel(self, job_id: str) -> Optional[LikeJob]:
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job.cancel_event.set()
+            queue = self._queues[job.kind]
+            for index, entry in enumerate(queue):
+                if entry[2] is job:
+                    queue.pop(index)
+                    heapq.heapify(queue)
+                    job.finish("cancelled")
+                    self._publish_locked()
+                    break
+        return job
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            for job in self._jobs.values():
+                job.cancel_event.set()
+            for queue in self._queues.values():
+                for _, _, job in queue:
+                    job.finish("cancelled")
+                queue.clear()
+            self._publish_locked()
+            self._cond.notify_all()
+
+    def _next_locked(self) -> Optional[LikeJob]:
+        if self._queues["interactive"]:
+            return heapq.heappop(self._queues["interactive"])[2]
+        if self._queues["bulk"] and self._running["bulk"] == 0:
+            return heapq.heappop(self._queues["bulk"])[2]
+        return None
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                job = None
+                while not self._closed:
+                    job = self._next_locked()
+                    if job is not None:
+                        break
+                    self._cond.wait()
+                if job is None:
+                    return
+                self._running[job.kind] += 1
+                self._publish_locked()
+            job.start()
+            JOB_WAIT_SECONDS.observe(job.wait_s or 0.0, self._name, job.kind)
+            try:
+                self._runner(job)
+            except Exception as e:
+                if not job.finished:
+                    job.finish("failed", error=str(e))
+            finally:
+                with self._cond:
+                    self._running[job.kind] -= 1
+                    self._cond.notify_all()
 
 
 class LikeController:
-    def __init__(self, bot: QQAutoLikeBot, targets: List[str], delay: int, store: StateStore):
+    def __init__(
+        self,
+        bot: QQAutoLikeBot,
+        targets: Targets,
+        delay: int,
+        store: StateStore,
+        engine: str = "async",
+        concurrency: int = 4,
+        account: str = "default",
+        ledger: Optional[LikeLedger] = None,
+        daily_quota: int = 10,
+        history: Optional[RunHistory] = None,
+        run_deadline: float = 0.0,
+        pacer: Optional[AdaptivePacer] = None,
+        job_queue_size: int = 100,
+        job_workers: int = 2,
+        friends: Optional[FriendIndex] = None,
+    ):
         self.bot = bot
         self.targets = targets
         self.delay = delay
         self.store = store
-        self._task_lock = threading.Lock()
+        self.engine = engine
+        self.concurrency = concurrency
+        self.account = account
+        self.ledger = ledger
+        self.daily_quota = daily_quota
+        self.history = history
+        self.run_deadline = run_deadline
+        self.pacer = pacer
+        self.friends = friends
+        self.jobs = JobQueue(self._run_job, name=account, maxsize=job_queue_size, workers=job_workers)
+
+    def _remember(self, reason: str, started_ts: float, summary: Optional[Dict[str, Any]], error: str) -> None:
+        ended_ts = time.time()
+        summary = summary or {}
+        ok = not error and summary.get("fail", 0) == 0
+        RUN_SECONDS.observe(ended_ts - started_ts, self.account, reason)
+        RUNS_TOTAL.inc(self.account, reason, "ok" if ok else "fail")
+        if self.history is None:
+            return
+        self.history.append(
+            {
+                "reason": reason,
+                "started_at": datetime.fromtimestamp(started_ts).strftime("%Y-%m-%d %H:%M:%S"),
+                "ended_at": datetime.fromtimestamp(ended_ts).strftime("%Y-%m-%d %H:%M:%S"),
+                "started_ts": round(started_ts, 3),
+                "ended_ts": round(ended_ts, 3),
+                "duration_ms": round((ended_ts - started_ts) * 1000, 1),
+                "ok": ok,
+                "success": summary.get("success", 0),
+                "fail": summary.get("fail", 0),
+                "skipped": summary.get("skipped", 0),
+                "error": error,
+                "results": summary.get("results", []),
+            }
+        )
 
-    def like_users(self, user_ids: List[str], times: int, reason: str) -> Dict[str, Any]:
-        if not user_ids:
-            raise ValueError("TARGET_FRIENDS 为空，请先配置要点赞的 QQ 号")
-        if times < 1:
-            raise ValueError("times 必须 >= 1")
-        if not self._task_lock.acquire(blocking=False):
-            raise RuntimeError("当前有任务正在执行，请稍后再试")
+    def _record(self, user_id: str, times: int, ok: bool, result: Dict[str, Any]) -> None:
+        if self.ledger is None:
+            return
+        try:
+            self.ledger.record(self.account, user_id, times, ok, result)
+        except Exception as e:
+            print(f"[ledger] 写入失败: {e}")
+
+    def _plan(
+        self, targets: Iterable[LikeTarget], times: int, force: bool, counts: Dict[str, Any]
+    ) -> Iterator[LikeTarget]:
+        friends = self.friends.ids() if self.friends is not None and not force else frozenset()
+        for item in targets:
+            user_id, want = _like_target(item, times)
+            # 目标文件里的 times 只能减少次数，不能超过本次请求的次数（如手动“点赞 1 次”）
+            want = min(want, times)
+            if friends and user_id not in friends:
+                counts["not_friends"].append(user_id)
+                continue
+            if self.ledger is not None and not force:
+                remaining = self.ledger.remaining(self.account, user_id, self.daily_quota)
+                if remaining <= 0:
+                    counts["skipped"] += 1
+                    continue
+                want = min(want, remaining)
+            yield user_id if want == times else (user_id, want)
+
+    def _run_engine(self, targets: Iterable[LikeTarget], times: int, job: LikeJob) -> Dict[str, Any]:
+        deadline = time.monotonic() + self.run_deadline if self.run_deadline > 0 else None
+
+        def on_result(user_id: str, like_times: int, ok: bool, result: Dict[str, Any]) -> None:
+            self._record(user_id, like_times, ok, result)
+            job.add_event(user_id, like_times, ok, result)
+
+        if self.engine == "sync":
+            return self.bot.auto_like_friends(
+                targets,
+                times,
+                self.delay,
+                on_result=on_result,
+                deadline=deadline,
+                pacer=self.pacer,
+                cancel=job.cancel_event,
+            )
+        return asyncio.run(
+            self.bot.auto_like_friends_async(
+                targets,
+                times,
+                self.delay,
+                self.concurrency,
+                on_result=on_result,
+                deadline=deadline,
+                pacer=self.pacer,
+                cancel=job.cancel_event,
+            )
+        )
 
+    def state(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = asdict(self.store.get())
+        if self.pacer is not None:
+            data["pacing"] = self.pacer.snapshot()
+        return data
+
+    def _run_job(self, job: LikeJob) -> None:
         started_at = _now_str()
+        started_ts = time.time()
         try:
-            summary = self.bot.auto_like_friends(user_ids, times, self.delay)
+            counts: Dict[str, Any] = {"skipped": 0, "not_friends": []}
+            plan = self._plan(job.user_ids, job.times, job.force, counts)
+            first = next(plan, None)
+            if first is not None:
+                summary = self._run_engine(itertools.chain([first], plan), job.times, job)
+            else:
+                print(f"[{_now_str()}] 没有需要点赞的目标（今日次数已用完或都不是好友），跳过")
+                summary = {"success": 0, "fail": 0}
+            not_friends = counts["not_friends"]
+            if not_friends:
+                print(f"[{_now_str()}] 跳过 {len(not_friends)} 个非好友目标: {', '.join(not_friends[:10])}")
+            job.skipped = counts["skipped"] + len(not_friends)
+            summary["skipped"] = counts["skipped"]
+            summary["not_friends"] = len(not_friends)
             ok = bool(summary.get("fail", 0) == 0)
+            detail = {k: v for k, v in summary.items() if k != "results"}
             self.store.update(
-                last_action=reason,
+                last_action=job.reason,
                 last_action_at=started_at,
                 last_action_ok=ok,
-                last_action_detail=json.dumps(summary, ensure_ascii=False),
+                last_action_detail=json.dumps(detail, ensure_ascii=False),
             )
-            return summary
+            self._remember(job.reason, started_ts, summary, "")
+            job.finish("cancelled" if summary.get("cancelled") else "done", summary)
         except Exception as e:
             self.store.update(
-                last_action=reason,
+                last_action=job.reason,
                 last_action_at=started_at,
                 last_action_ok=False,
                 last_action_detail=str(e),
             )
-            raise
-        finally:
-            self._task_lock.release()
+            self._remember(job.reason, started_ts, None, str(e))
+            job.finish("failed", error=str(e))
+
+    def submit(self, user_ids: Targets, times: int, reason: str, force: bool = False) -> LikeJob:
+        if not isinstance(user_ids, TargetSource):
+            user_ids = list(user_ids)
+        if not user_ids:
+            raise ValueError("TARGET_FRIENDS 为空，请先配置要点赞的 QQ 号")
+        if times < 1:
+            raise ValueError("times 必须 >= 1")
+        return self.jobs.submit(LikeJob(user_ids, times, reason, force))
+
+    def like_users(self, user_ids: Targets, times: int, reason: str, force: bool = False) -> Dict[str, Any]:
+        job = self.submit(user_ids, times, reason, force)
+        job.wait()
+        if job.status == "failed" or job.summary is None:
+            raise RuntimeError(job.error or "任务已取消")
+        return job.summary
+
+    def like_all(self, times: int, reason: str, force: bool = False) -> Dict[str, Any]:
+        return self.like_users(self.targets, times, reason, force)
+
+    def close(self) -> None:
+        self.jobs.close()
+
+
+def _parse_schedule_times(value: Any) -> List[str]:
+    raw = value if isinstance(value, (list, tuple)) else str(value or "").split(",")
+    times: List[str] = []
+    for item in raw:
+        item = str(item).strip()
+        if not item:
+            continue
+        try:
+            parsed = datetime.strptime(item, "%H:%M")
+        except ValueError:
+            raise ValueError(f"SCHEDULE_TIME 格式不正确：{item!r}，应为 HH:MM（例如 09:00）") from None
+        times.append(parsed.strftime("%H:%M"))
+    if not times:
+        raise ValueError("SCHEDULE_TIME 不能为空")
+    return sorted(set(times))
+
+
+@dataclass
+class _DailyJob:
+    name: str
+    times: List[str]
+    func: Callable[[], None]
+    jitter: float = 0.0
+    paused: bool = False
+    next_run: Optional[datetime] = None
+    token: int = 0
+    # 每天只随机一次推迟秒数，重新计算下次执行时间时沿用，避免同一天重复触发
+    offsets: Dict[date, float] = field(default_factory=dict)
+
+    def offset(self, day: date) -> float:
+        if self.jitter <= 0:
+            return 0.0
+        if day not in self.offsets:
+            self.offsets = {d: v for d, v in self.offsets.items() if d >= day - timedelta(days=1)}
+            self.offsets[day] = random.uniform(0, self.jitter)
+        return self.offsets[day]
+
+
+# 最小堆定时器：只睡到最近一个任务的触发时间，任务变更时通过 Condition 唤醒
+class TimerScheduler:
+    # 墙钟可能被校时调整，最长睡这么久就重新核对一次
+    MAX_SLEEP = 3600.0
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._heap: List[Tuple[float, int, str]] = []
+        self._jobs: Dict[str, _DailyJob] = {}
+        self._tokens = itertools.count(1)
+        self._stopped = False
+
+    @staticmethod
+    def _next_occurrence(job: _DailyJob, after: datetime) -> datetime:
+        candidates = []
+        for hhmm in job.times:
+            hour, minute = (int(x) for x in hhmm.split(":"))
+            at = after.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            # 按加上当天推迟后的时间判断今天是否已过：推迟窗口内重新安排时仍保留今天这次
+            if at + timedelta(seconds=job.offset(at.date())) <= after:
+                at += timedelta(days=1)
+            candidates.append(at + timedelta(seconds=job.offset(at.date())))
+        return min(candidates)
+
+    def _push_locked(self, job: _DailyJob, after: datetime) -> None:
+        job.token = next(self._tokens)
+        if job.paused:
+            job.next_run = None
+            return
+        job.next_run = self._next_occurrence(job, after)
+        heapq.heappush(self._heap, (job.next_run.timestamp(), job.token, job.name))
+
+    def add_daily(
+        self, name: str, times: List[str], func: Callable[[], None], jitter: float = 0.0, paused: bool = False
+    ) -> None:
+        job = _DailyJob(name=name, times=_parse_schedule_times(times), func=func, jitter=jitter, paused=paused)
+        with self._cond:
+            self._jobs[name] = job
+            self._push_locked(job, datetime.now())
+            self._cond.notify_all()
+
+    def reschedule(self, name: str, times: List[str]) -> None:
+        parsed = _parse_schedule_times(times)
+        with self._cond:
+            job = self._jobs.get(name)
+            if job is None:
+                return
+            job.times = parsed
+            self._push_locked(job, datetime.now())
+            self._cond.notify_all()
+
+    def set_paused(self, name: str, paused: bool) -> None:
+        with self._cond:
+            job = self._jobs.get(name)
+            if job is None or job.paused == paused:
+                return
+            job.paused = paused
+            self._push_locked(job, datetime.now())
+            self._cond.notify_all()
+
+    def next_run(self, name: str) -> Optional[datetime]:
+        with self._cond:
+            job = self._jobs.get(name)
+            return job.next_run if job else None
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def run_forever(self) -> None:
+        while True:
+            with self._cond:
+                job = None
+                while not self._stopped:
+                    # 丢弃暂停或已被重新安排的旧堆项
+                    while self._heap and self._heap[0][1] != self._jobs[self._heap[0][2]].token:
+                        heapq.heappop(self._heap)
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    due, _, name = self._heap[0]
+                    wait_s = due - time.time()
+                    if wait_s > 0:
+                        self._cond.wait(min(wait_s, self.MAX_SLEEP))
+                        continue
+                    heapq.heappop(self._heap)
+                    job = self._jobs[name]
+                    self._push_locked(job, datetime.now())
+                    break
+                if self._stopped:
+                    return
+            try:
+                job.func()
+            except Exception as e:
+                print(f"[{_now_str()}] [{job.name}] 定时任务执行失败: {e}")
+
+
+def _add_minutes(hhmm: str, minutes: float) -> str:
+    base = datetime.strptime(hhmm, "%H:%M")
+    return (base + timedelta(minutes=minutes)).strftime("%H:%M")
+
+
+def plan_shards(
+    targets: Iterable[str],
+    accounts: List[Dict[str, Any]],
+    copies: int = 1,
+    start: str = "09:00",
+    window_minutes: float = 60.0,
+    stagger_minutes: float = 5.0,
+    latency: float = 0.5,
+) -> Dict[str, Any]:
+    # 每个目标分给 copies 个不同账号；每个账号不超过 daily_targets 和窗口内按 delay 能发完的数量
+    start = _parse_schedule_times(start)[0]
+    copies = max(1, int(copies))
+    slots: List[Dict[str, Any]] = []
+    for index, spec in enumerate(accounts):
+        per_target = max(0.0, float(spec.get("delay") or 0)) + latency
+        capacity = int(window_minutes * 60 // per_target) if per_target > 0 else 0
+        limit = int(spec.get("daily_targets") or 0)
+        if limit > 0:
+            capacity = min(capacity, limit)
+        slots.append(
+            {
+                "account": str(spec["name"]),
+                "capacity": capacity,
+                "per_target": per_target,
+                "schedule_time": _add_minutes(start, index * stagger_minutes),
+                "targets": [],
+            }
+        )
+
+    unassigned: List[str] = []
+    seen = set()
+    for target in targets:
+        target = str(target).strip()
+        if not target or target in seen:
+            continue
+        seen.add(target)
+        # 剩余容量最多的账号优先，容量相同时按账号顺序
+        free = [slot for slot in slots if len(slot["targets"]) < slot["capacity"]]
+        free.sort(key=lambda slot: len(slot["targets"]) - slot["capacity"])
+        if len(free) < copies:
+            unassigned.append(target)
+            continue
+        for slot in free[:copies]:
+            slot["targets"].append(target)
+
+    plans = []
+    for slot in slots:
+        seconds = len(slot["targets"]) * slot["per_target"]
+        plans.append(
+            {
+                "account": slot["account"],
+                "targets": slot["targets"],
+                "schedule_time": slot["schedule_time"],
+                "window_end": _add_minutes(slot["schedule_time"], seconds / 60),
+                "estimated_seconds": round(seconds, 1),
+                "capacity": slot["capacity"],
+            }
+        )
+    return {"plans": plans, "unassigned": unassigned, "copies": copies}
+
+
+def plan_from_payload(
+    payload: Dict[str, Any], accounts: List[Dict[str, Any]], default_targets: Iterable[str]
+) -> Dict[str, Any]:
+    """解析 /api/plan、/api/shard 的请求体并调用 plan_shards；未给 targets 时用 default_targets。"""
+    targets = _parse_targets(payload.get("targets")) or list(default_targets)
+    try:
+        return plan_shards(
+            targets,
+            accounts,
+            copies=int(payload.get("copies") or 1),
+            start=str(payload.get("start") or "09:00"),
+            window_minutes=float(payload.get("window_minutes") or 60),
+            stagger_minutes=float(payload.get("stagger_minutes") if payload.get("stagger_minutes") is not None else 5),
+        )
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"分片参数不正确：{e}") from e
+
 
-    def like_all(self, times: int, reason: str) -> Dict[str, Any]:
-        return self.like_users(self.targets, times, reason)
+@dataclass
+class Account:
+    name: str
+    bot: QQAutoLikeBot
+    store: StateStore
+    controller: LikeController
+    config: Dict[str, Any]
+    napcat_cache: TTLCache
+    targets: Targets
+    event_secret: str = ""
+    scheduler: Optional[TimerScheduler] = None
+
+    def set_schedule_enabled(self, enabled: bool) -> BotState:
+        state = self.store.update(schedule_enabled=enabled)
+        if self.scheduler is not None:
+            self.scheduler.set_paused(self.name, not enabled)
+        return state
+
+    def schedule_times(self) -> List[str]:
+        state = self.store.get()
+        return (state.plan_schedule_time or self.config["schedule_time"]).split(",")
+
+    def plan(self) -> Dict[str, Any]:
+        state = self.store.get()
+        return {
+            "active": state.plan_targets is not None,
+            "targets": _targets_page(self.controller.targets, 0, 1000),
+            "targets_total": len(self.controller.targets),
+            "schedule_time": ",".join(self.schedule_times()),
+        }
+
+    def config_view(self, offset: int = 0, limit: int = 100) -> Dict[str, Any]:
+        # targets 是当前生效的目标（有分片计划时为计划里的目标），configured_targets 始终是配置的目标
+        targets = self.controller.targets
+        view = dict(self.config)
+        view["targets"] = _targets_page(targets, offset, limit)
+        view["targets_total"] = len(targets)
+        view["targets_offset"] = offset
+        view["plan_active"] = targets is not self.targets
+        if targets is self.targets:
+            view["configured_targets"] = view["targets"]
+        else:
+            view["configured_targets"] = _targets_page(self.targets, offset, limit)
+        view["configured_targets_total"] = len(self.targets)
+        if isinstance(self.targets, TargetSource):
+            view["targets_source"] = self.targets.stats()
+        return view
+
+    def apply_plan(self, targets: Optional[List[str]], schedule_time: str = "") -> Dict[str, Any]:
+        """targets 为 None 时清除分片计划，恢复配置里的目标和定时。"""
+        if schedule_time:
+            schedule_time = ",".join(_parse_schedule_times(schedule_time))
+        self.store.update(plan_targets=targets, plan_schedule_time=schedule_time if targets is not None else "")
+        self.controller.targets = self.targets if targets is None else targets
+        if self.scheduler is not None:
+            self.scheduler.reschedule(self.name, self.schedule_times())
+        return self.plan()
 
 
 def _token_qs(token: str) -> str:
@@ -226,6 +2374,7 @@ def _render_admin_page(
     login_info: Optional[Dict[str, Any]],
     napcat_error: str,
     token: str,
+    base: str = "",
 ) -> str:
     def esc(s: Any) -> str:
         return html.escape("" if s is None else str(s), quote=True)
@@ -247,7 +2396,11 @@ def _render_admin_page(
     action_suffix = _token_qs(token)
 
     targets = config.get("targets") or []
-    targets_text = ", ".join(str(x) for x in targets)
+    targets_text = ", ".join(str(x["user_id"] if isinstance(x, dict) else x) for x in targets)
+    targets_total = config.get("targets_total", len(targets))
+    if targets_total > len(targets):
+        targets_text += f" …（共 {targets_total} 个）"
+    targets_label = f"TARGETS_FILE（{config['targets_file']}）" if config.get("targets_file") else "TARGET_FRIENDS"
 
     status_line = ""
     if napcat_error:
@@ -310,7 +2463,7 @@ def _render_admin_page(
 </head>
 <body>
 <div class="container">
-  <h1>QQ 自动点赞管理</h1>
+  <h1>QQ 自动点赞管理{esc(' - ' + str(config['account'])) if config.get('account') else ''}</h1>
   <div class="grid">
     <div class="card">
       <h2>运行状态</h2>
@@ -322,11 +2475,11 @@ def _render_admin_page(
       {last_detail_block}
       <div class="hr"></div>
       <div class="row">
-        <form method="post" action="/toggle_schedule{action_suffix}">
+        <form method="post" action="{base}/toggle_schedule{action_suffix}">
           <input type="hidden" name="enabled" value="1">
           <button class="btn secondary" type="submit">开启定时点赞</button>
         </form>
-        <form method="post" action="/toggle_schedule{action_suffix}">
+        <form method="post" action="{base}/toggle_schedule{action_suffix}">
           <input type="hidden" name="enabled" value="0">
           <button class="btn danger" type="submit">关闭定时点赞</button>
         </form>
@@ -337,18 +2490,18 @@ def _render_admin_page(
     <div class="card">
       <h2>手动点赞</h2>
       <div class="row">
-        <form method="post" action="/like_once{action_suffix}">
+        <form method="post" action="{base}/like_once{action_suffix}">
           <button class="btn" type="submit">对所有目标点赞 1 次</button>
         </form>
       </div>
       <div class="hr"></div>
-      <form method="post" action="/like_once{action_suffix}">
+      <form method="post" action="{base}/like_once{action_suffix}">
         <div class="row">
           <input name="user_id" placeholder="指定 QQ 号（可选）" class="mono" style="min-width: 220px;">
           <button class="btn secondary" type="submit">对指定 QQ 点赞 1 次</button>
         </div>
       </form>
-      <div class="muted" style="margin-top:8px;">目标列表来自 <code>TARGET_FRIENDS</code> 环境变量。</div>
+      <div class="muted" style="margin-top:8px;">目标列表来自 <code>TARGET_FRIENDS</code> 环境变量或 <code>TARGETS_FILE</code> 目标文件。</div>
     </div>
 
     <div class="card">
@@ -364,13 +2517,13 @@ def _render_admin_page(
 
     <div class="card">
       <h2>当前配置</h2>
-      <div class="muted">TARGET_FRIENDS：</div>
+      <div class="muted">{esc(targets_label)}：</div>
       <div class="pre mono">{esc(targets_text)}</div>
       <div class="muted">定时：每天 {esc(schedule_time)}；每人 {esc(like_times)} 次；间隔 {esc(delay)} 秒</div>
       {f'<div class="muted">状态文件：<span class="mono">{esc(state_file)}</span></div>' if state_file else ''}
       <div class="hr"></div>
       <div class="row">
-        <a href="/{action_suffix}">刷新页面</a>
+        <a href="{base}/{action_suffix}">刷新页面</a>
         <span class="muted">（端口映射在 docker-compose.yml 的 like-bot1 -> ports）</span>
       </div>
     </div>
@@ -380,13 +2533,116 @@ def _render_admin_page(
 </html>"""
 
 
+def _render_accounts_page(accounts: Dict[str, "Account"], token: str) -> str:
+    def esc(s: Any) -> str:
+        return html.escape("" if s is None else str(s), quote=True)
+
+    action_suffix = _token_qs(token)
+    rows = "".join(
+        f'<li><a href="/a/{quote(name)}/{action_suffix}">{esc(name)}</a>'
+        f' <span class="muted mono">{esc(account.config.get("api_url", ""))}</span></li>'
+        for name, account in accounts.items()
+    )
+    return f"""<!doctype html>
+<html lang="zh-CN">
+<head>
+  <meta charset="utf-8">
+  <meta name="viewport" content="width=device-width, initial-scale=1">
+  <title>QQ 自动点赞管理</title>
+  <style>
+    body {{ font-family: -apple-system,BlinkMacSystemFont,"Segoe UI",Helvetica,Arial,"PingFang SC","Hiragino Sans GB","Microsoft YaHei",sans-serif; background:#0b0f14; color:#e6edf3; margin:0; }}
+    a {{ color:#7ee787; }}
+    .container {{ max-width: 920px; margin: 0 auto; padding: 24px; }}
+    h1 {{ font-size: 20px; margin: 0 0 12px; }}
+    li {{ margin: 8px 0; }}
+    .muted {{ color:#9da7b3; font-size: 12px; }}
+    .mono {{ font-family: ui-monospace,SFMono-Regular,Menlo,Monaco,Consolas,"Liberation Mono","Courier New",monospace; }}
+  </style>
+</head>
+<body>
+<div class="container">
+  <h1>QQ 自动点赞管理（{len(accounts)} 个账号）</h1>
+  <ul>{rows}</ul>
+</div>
+</body>
+</html>"""
+
+
+def _next_run_str(account: Account) -> str:
+    next_run = account.scheduler.next_run(account.name) if account.scheduler else None
+    return next_run.isoformat(sep=" ", timespec="seconds") if next_run else ""
+
+
+def _parse_since(value: str) -> float:
+    value = (value or "").strip()
+    if not value:
+        return 0.0
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise ValueError(f"since 应为时间戳或 YYYY-MM-DD[ HH:MM:SS]，当前: {value!r}") from None
+
+
+def _napcat_probe(
+    bot: QQAutoLikeBot, cache: TTLCache, fresh: bool = False
+) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]], str]:
+    # 最近收到过心跳 / 生命周期事件时直接使用事件维护的状态，不请求 NapCat
+    if not fresh and bot.events.fresh():
+        return bot.events.snapshot()
+    napcat_error = ""
+    napcat_status = None
+    login_info = None
+    try:
+        napcat_status = cache.get("get_status", bot.get_status, fresh)
+    except Exception as e:
+        napcat_error = str(e)
+    try:
+        login_info = cache.get("get_login_info", bot.get_login_info, fresh)
+        bot.events.remember_login(login_info)
+    except Exception as e:
+        napcat_error = napcat_error or str(e)
+    return napcat_status, login_info, napcat_error
+
+
+_ADMIN_ROUTES = {
+    "",
+    "/",
+    "/metrics",
+    "/api/accounts",
+    "/api/config",
+    "/api/state",
+    "/api/history",
+    "/api/history/:id",
+    "/api/next_run",
+    "/api/snapshot",
+    "/api/napcat",
+    "/onebot/event",
+    "/api/plan",
+    "/api/shard",
+    "/api/friends",
+    "/api/jobs",
+    "/api/jobs/:id",
+    "/api/jobs/:id/events",
+    "/api/jobs/:id/cancel",
+    "/toggle_schedule",
+    "/like_once",
+    "/api/like_once",
+    "/api/toggle_schedule",
+    "/api/run",
+}
+
+
 def _make_admin_handler(
-    controller: LikeController,
-    bot: QQAutoLikeBot,
-    store: StateStore,
-    config: Dict[str, Any],
+    accounts: Dict[str, Account],
     admin_token: Optional[str],
 ) -> type[BaseHTTPRequestHandler]:
+    # 单账号时保持原有的无前缀路由；多账号时每个账号挂在 /a/<name>/ 下
+    default_account = next(iter(accounts.values())) if len(accounts) == 1 else None
+
     class Handler(BaseHTTPRequestHandler):
         server_version = "QQLikeAdmin/1.0"
 
@@ -397,6 +2653,28 @@ def _make_admin_handler(
             parsed = urlparse(self.path)
             return parsed.path, parse_qs(parsed.query)
 
+        def _resolve(self, path: str) -> Tuple[Optional[Account], str, str]:
+            if path.startswith("/a/"):
+                name, _, rest = path[3:].partition("/")
+                return accounts.get(unquote(name)), f"/a/{quote(unquote(name))}", "/" + rest
+            return default_account, "", path
+
+        def _send_accounts(self, path: str, token: str) -> None:
+            if path in {"", "/"}:
+                self._send_html(_render_accounts_page(accounts, token if admin_token else ""))
+                return
+            if path == "/api/accounts":
+                self._send_json(
+                    {
+                        "accounts": [
+                            {"name": name, "path": f"/a/{quote(name)}", "next_run": _next_run_str(account)}
+                            for name, account in accounts.items()
+                        ]
+                    }
+                )
+                return
+            self._send_text("Not Found", HTTPStatus.NOT_FOUND)
+
         def _auth_ok(self, token: str) -> bool:
             if not admin_token:
                 return True
@@ -421,14 +2699,25 @@ def _make_admin_handler(
             self.end_headers()
             self.wfile.write(body)
 
-        def _send_json(self, obj: Any, status: HTTPStatus = HTTPStatus.OK) -> None:
-            body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        def _send_bytes(
+            self,
+            body: bytes,
+            content_type: str,
+            status: HTTPStatus = HTTPStatus.OK,
+            extra_headers: Optional[Dict[str, str]] = None,
+        ) -> None:
             self.send_response(status.value)
-            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Type", content_type)
             self.send_header("Content-Length", str(len(body)))
+            for key, value in (extra_headers or {}).items():
+                self.send_header(key, value)
             self.end_headers()
             self.wfile.write(body)
 
+        def _send_json(self, obj: Any, status: HTTPStatus = HTTPStatus.OK) -> None:
+            body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+            self._send_bytes(body, "application/json; charset=utf-8", status)
+
         def _redirect(self, location: str) -> None:
             self.send_response(HTTPStatus.SEE_OTHER.value)
             self.send_header("Location", location)
@@ -443,84 +2732,263 @@ def _make_admin_handler(
                 return b""
             return self.rfile.read(length)
 
+        def _route(self) -> str:
+            path = urlparse(self.path).path
+            if path.startswith("/a/"):
+                path = "/" + path[3:].partition("/")[2]
+            if path.startswith("/api/jobs/"):
+                tail = path[len("/api/jobs/") :].partition("/")[2]
+                path = "/api/jobs/:id" + (f"/{tail}" if tail else "")
+            elif path.startswith("/api/history/"):
+                path = "/api/history/:id"
+            return path if path in _ADMIN_ROUTES else "other"
+
         def do_GET(self) -> None:  # noqa: N802
+            with ADMIN_SECONDS.time("GET", self._route()):
+                self._handle_get()
+
+        def do_POST(self) -> None:  # noqa: N802
+            with ADMIN_SECONDS.time("POST", self._route()):
+                self._handle_post()
+
+        def _handle_get(self) -> None:
             path, query = self._get_query()
             token = (query.get("token", [""])[0] or "").strip()
             if not self._auth_ok(token):
                 self._send_text("Unauthorized", HTTPStatus.UNAUTHORIZED)
                 return
+            fresh = _parse_bool(query.get("fresh", [""])[0], False)
+
+            if path == "/metrics":
+                self._send_bytes(METRICS.render().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8")
+                return
+
+            account, base, path = self._resolve(path)
+            if account is None:
+                self._send_accounts(path, token)
+                return
+            bot, store, config, napcat_cache = account.bot, account.store, account.config, account.napcat_cache
 
             if path in {"", "/"}:
                 state = store.get()
-                try:
-                    next_run = (
-                        schedule.jobs[0].next_run.isoformat(sep=" ", timespec="seconds") if schedule.jobs else ""
-                    )
-                except Exception:
-                    next_run = ""
-
-                napcat_error = ""
-                napcat_status = None
-                login_info = None
-                try:
-                    napcat_status = bot.get_status()
-                except Exception as e:
-                    napcat_error = str(e)
-                try:
-                    login_info = bot.get_login_info()
-                except Exception as e:
-                    napcat_error = napcat_error or str(e)
+                napcat_status, login_info, napcat_error = _napcat_probe(bot, napcat_cache, fresh)
 
                 page = _render_admin_page(
                     state=state,
-                    config=config,
-                    next_run=next_run,
+                    config=account.config_view(),
+                    next_run=_next_run_str(account),
                     napcat_status=napcat_status,
                     login_info=login_info,
                     napcat_error=napcat_error,
                     token=token if admin_token else "",
+                    base=base,
                 )
                 self._send_html(page)
                 return
 
             if path == "/api/config":
-                self._send_json(config)
+                try:
+                    offset = max(0, int(query.get("offset", ["0"])[0] or 0))
+                    limit = max(0, int(query.get("limit", ["100"])[0] or 100))
+                except ValueError:
+                    self._send_json({"error": "offset/limit 必须是整数"}, HTTPStatus.BAD_REQUEST)
+                    return
+                self._send_json(account.config_view(offset, limit))
                 return
 
             if path == "/api/state":
-                self._send_json(asdict(store.get()))
+                self._send_json(account.controller.state())
                 return
 
-            if path == "/api/next_run":
+            if path == "/api/history":
                 try:
-                    next_run = (
-                        schedule.jobs[0].next_run.isoformat(sep=" ", timespec="seconds") if schedule.jobs else ""
-                    )
-                except Exception:
-                    next_run = ""
-                self._send_json({"next_run": next_run})
+                    since = _parse_since(query.get("since", [""])[0])
+                    limit = max(1, min(int(query.get("limit", ["20"])[0] or 20), 200))
+                    cursor_raw = (query.get("cursor", [""])[0] or "").strip()
+                    cursor = int(cursor_raw) if cursor_raw else None
+                except ValueError as e:
+                    self._send_json({"error": str(e)}, HTTPStatus.BAD_REQUEST)
+                    return
+                if account.controller.history is None:
+                    self._send_json({"items": [], "next_cursor": None})
+                    return
+                self._send_json(account.controller.history.query(since, limit, cursor))
+                return
+
+            if path.startswith("/api/history/"):
+                record_id = path[len("/api/history/") :]
+                history = account.controller.history
+                record = history.detail(int(record_id)) if history is not None and record_id.isdigit() else None
+                if record is None:
+                    self._send_json({"error": "记录不存在"}, HTTPStatus.NOT_FOUND)
+                    return
+                self._send_json(record)
+                return
+
+            if path == "/api/next_run":
+                self._send_json({"next_run": _next_run_str(account)})
+                return
+
+            if path == "/api/snapshot":
+                napcat_status, login_info, napcat_error = _napcat_probe(bot, napcat_cache, fresh)
+                snapshot = {
+                    "config": account.config_view(),
+                    "state": account.controller.state(),
+                    "next_run": _next_run_str(account),
+                    "napcat": {"error": napcat_error, "status": napcat_status, "login": login_info},
+                }
+                body = json.dumps(snapshot, ensure_ascii=False, sort_keys=True).encode("utf-8")
+                etag = f'"{hashlib.sha1(body).hexdigest()}"'
+                if_none_match = self.headers.get("If-None-Match") or ""
+                if etag in {tag.strip() for tag in if_none_match.split(",")}:
+                    self.send_response(HTTPStatus.NOT_MODIFIED.value)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self._send_bytes(body, "application/json; charset=utf-8", extra_headers={"ETag": etag})
                 return
 
             if path == "/api/napcat":
-                napcat_error = ""
-                napcat_status = None
-                login_info = None
-                try:
-                    napcat_status = bot.get_status()
-                except Exception as e:
-                    napcat_error = str(e)
-                try:
-                    login_info = bot.get_login_info()
-                except Exception as e:
-                    napcat_error = napcat_error or str(e)
-                self._send_json({"error": napcat_error, "status": napcat_status, "login": login_info})
+                napcat_status, login_info, napcat_error = _napcat_probe(bot, napcat_cache, fresh)
+                self._send_json(
+                    {
+                        "error": napcat_error,
+                        "status": napcat_status,
+                        "login": login_info,
+                        "transport": bot.transport_stats(),
+                        "events": bot.events.view(),
+                        "cache": napcat_cache.stats(),
+                        "breaker": bot.breaker.snapshot(),
+                    }
+                )
+                return
+
+            if path == "/api/plan":
+                self._send_json(account.plan())
+                return
+
+            if path == "/api/friends":
+                friends = account.controller.friends
+                if friends is None:
+                    self._send_json({"error": "未启用好友过滤（FRIENDS_FILTER=false）"}, HTTPStatus.NOT_FOUND)
+                    return
+                refresh = _parse_bool(query.get("refresh", [""])[0], False)
+                ids = friends.ids(refresh=refresh)
+                targets = account.controller.targets
+                not_friends = [t for t in _target_ids(targets) if t not in ids] if ids else []
+                self._send_json(
+                    dict(
+                        friends.stats(),
+                        targets_total=len(targets),
+                        not_friends=not_friends[:1000],
+                        not_friends_total=len(not_friends),
+                    )
+                )
                 return
 
+            if path == "/api/jobs":
+                jobs = account.controller.jobs
+                self._send_json({"queue": jobs.stats(), "jobs": [job.view() for job in reversed(jobs.list())]})
+                return
+
+            if path.startswith("/api/jobs/"):
+                job_id, _, tail = path[len("/api/jobs/") :].partition("/")
+                job = account.controller.jobs.get(job_id)
+                if job is None:
+                    self._send_json({"error": "任务不存在"}, HTTPStatus.NOT_FOUND)
+                    return
+                if not tail:
+                    data = job.view()
+                    if job.summary is not None:
+                        data["summary"] = {k: v for k, v in job.summary.items() if k != "results"}
+                    self._send_json(data)
+                    return
+                if tail == "events":
+                    self._stream_job(job)
+                    return
+
             self._send_text("Not Found", HTTPStatus.NOT_FOUND)
 
-        def do_POST(self) -> None:  # noqa: N802
+        def _stream_job(self, job: LikeJob) -> None:
+            # Server-Sent Events：每个目标一条 result 事件，结束时发 end；断线重连时按 Last-Event-ID 续传
+            try:
+                last_id = max(0, int(self.headers.get("Last-Event-ID") or 0))
+            except ValueError:
+                last_id = 0
+            self.send_response(HTTPStatus.OK.value)
+            self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            try:
+                while True:
+                    events, finished = job.events_after(last_id, 15.0)
+                    chunks = []
+                    for event in events:
+                        data = json.dumps(event, ensure_ascii=False)
+                        chunks.append(f"id: {event['id']}\nevent: result\ndata: {data}\n\n")
+                        last_id = event["id"]
+                    if finished:
+                        chunks.append(f"event: end\ndata: {json.dumps(job.view(), ensure_ascii=False)}\n\n")
+                    elif not events:
+                        chunks.append(": keepalive\n\n")
+                    self.wfile.write("".join(chunks).encode("utf-8"))
+                    self.wfile.flush()
+                    if finished:
+                        return
+            except (BrokenPipeError, ConnectionResetError):
+                return
+
+        def _shard(self, payload: Dict[str, Any]) -> None:
+            # 在本进程的多个账号之间分片，默认目标为所有账号配置目标的并集
+            if _parse_bool(str(payload.get("clear", "")), False):
+                self._send_json({"plans": [account.apply_plan(None) for account in accounts.values()]})
+                return
+            union: Dict[str, None] = {}
+            for account in accounts.values():
+                union.update(dict.fromkeys(_target_ids(account.targets)))
+            specs = [
+                {"name": name, "delay": account.config["delay"], "daily_targets": account.config["daily_targets"]}
+                for name, account in accounts.items()
+            ]
+            try:
+                result = plan_from_payload(payload, specs, union)
+            except ValueError as e:
+                self._send_json({"error": str(e)}, HTTPStatus.BAD_REQUEST)
+                return
+            if not _parse_bool(str(payload.get("dry_run", "")), False):
+                for plan in result["plans"]:
+                    accounts[plan["account"]].apply_plan(plan["targets"], plan["schedule_time"])
+                print(f"[{_now_str()}] 已在 {len(accounts)} 个账号间应用分片计划，未分配 {len(result['unassigned'])} 个目标")
+            self._send_json(result)
+
+        def _handle_event(self, path: str, token: str) -> None:
+            # NapCat HTTP 上报：配置了 event_secret 时校验签名，否则按管理 token 鉴权
+            account, _, _ = self._resolve(path)
+            if account is None:
+                self._send_text("Not Found", HTTPStatus.NOT_FOUND)
+                return
+            body = self._read_body()
+            if account.event_secret:
+                if not _verify_signature(account.event_secret, body, self.headers.get("X-Signature") or ""):
+                    self._send_text("Forbidden", HTTPStatus.FORBIDDEN)
+                    return
+            elif not self._auth_ok(token):
+                self._send_text("Unauthorized", HTTPStatus.UNAUTHORIZED)
+                return
+            try:
+                event = json.loads(body.decode("utf-8") or "{}")
+            except ValueError:
+                self._send_text("Bad Request", HTTPStatus.BAD_REQUEST)
+                return
+            account.bot.events.observe(event, "http")
+            self._send_bytes(b"", "text/plain; charset=utf-8", HTTPStatus.NO_CONTENT)
+
+        def _handle_post(self) -> None:
             path, query = self._get_query()
             token = (query.get("token", [""])[0] or "").strip()
+            if path.endswith("/onebot/event"):
+                self._handle_event(path, token)
+                return
             if not self._auth_ok(token):
                 self._send_text("Unauthorized", HTTPStatus.UNAUTHORIZED)
                 return
@@ -545,10 +3013,20 @@ def _make_admin_handler(
                 values = form.get(key) or []
                 return (values[0] if values else "").strip()
 
+            if path == "/api/shard":
+                self._shard(payload)
+                return
+
+            account, base, path = self._resolve(path)
+            if account is None:
+                self._send_text("Not Found", HTTPStatus.NOT_FOUND)
+                return
+            controller, store = account.controller, account.store
+
             if path == "/toggle_schedule":
                 enabled = _parse_bool(form_value("enabled"), True)
-                store.update(schedule_enabled=enabled)
-                self._redirect(f"/{_token_qs(token if admin_token else '')}")
+                account.set_schedule_enabled(enabled)
+                self._redirect(f"{base}/{_token_qs(token if admin_token else '')}")
                 return
 
             if path == "/like_once":
@@ -565,7 +3043,7 @@ def _make_admin_handler(
                         last_action_ok=False,
                         last_action_detail=str(e),
                     )
-                self._redirect(f"/{_token_qs(token if admin_token else '')}")
+                self._redirect(f"{base}/{_token_qs(token if admin_token else '')}")
                 return
 
             if path == "/api/like_once":
@@ -576,6 +3054,8 @@ def _make_admin_handler(
                     else:
                         summary = controller.like_all(1, "manual")
                     self._send_json(summary)
+                except JobQueueFull as e:
+                    self._send_json({"error": str(e)}, HTTPStatus.SERVICE_UNAVAILABLE)
                 except Exception as e:
                     self._send_json({"error": str(e)}, HTTPStatus.INTERNAL_SERVER_ERROR)
                 return
@@ -584,12 +3064,63 @@ def _make_admin_handler(
                 try:
                     enabled_raw = payload.get("enabled")
                     enabled = enabled_raw if isinstance(enabled_raw, bool) else _parse_bool(str(enabled_raw), True)
-                    state = store.update(schedule_enabled=enabled)
+                    state = account.set_schedule_enabled(enabled)
                     self._send_json(asdict(state))
                 except Exception as e:
                     self._send_json({"error": str(e)}, HTTPStatus.INTERNAL_SERVER_ERROR)
                 return
 
+            if path == "/api/plan":
+                try:
+                    if _parse_bool(str(payload.get("clear", "")), False):
+                        self._send_json(account.apply_plan(None))
+                        return
+                    targets = payload.get("targets")
+                    if targets is None:
+                        raise ValueError("缺少 targets")
+                    plan = account.apply_plan(_parse_targets(targets), str(payload.get("schedule_time") or ""))
+                    print(f"[{_now_str()}] [{account.name}] 已应用分片计划：{plan['targets_total']} 个目标，{plan['schedule_time']}")
+                    self._send_json(plan)
+                except ValueError as e:
+                    self._send_json({"error": str(e)}, HTTPStatus.BAD_REQUEST)
+                return
+
+            if path == "/api/jobs":
+                try:
+                    targets = _parse_targets(payload.get("targets") or payload.get("user_id")) or controller.targets
+                    tags = _parse_targets(payload.get("tags"))
+                    if tags:
+                        if not isinstance(targets, TargetSource):
+                            raise ValueError("tags 只能用于 TARGETS_FILE 目标文件")
+                        targets = targets.with_tags(tags)
+                    try:
+                        times_int = int(payload.get("times", 1))
+                    except Exception:
+                        times_int = 1
+                    times_int = max(1, min(times_int, 10))
+                    reason = str(payload.get("reason") or "manual").strip() or "manual"
+                    force_raw = payload.get("force", False)
+                    force = force_raw if isinstance(force_raw, bool) else _parse_bool(str(force_raw), False)
+                    job = controller.submit(targets, times_int, reason, force)
+                except JobQueueFull as e:
+                    self._send_json({"error": str(e)}, HTTPStatus.SERVICE_UNAVAILABLE)
+                    return
+                except (ValueError, RuntimeError) as e:
+                    self._send_json({"error": str(e)}, HTTPStatus.BAD_REQUEST)
+                    return
+                body = json.dumps(job.view(), ensure_ascii=False).encode("utf-8")
+                location = {"Location": f"{base}/api/jobs/{job.id}"}
+                self._send_bytes(body, "application/json; charset=utf-8", HTTPStatus.ACCEPTED, location)
+                return
+
+            if path.startswith("/api/jobs/") and path.endswith("/cancel"):
+                job = controller.jobs.cancel(path[len("/api/jobs/") : -len("/cancel")])
+                if job is None:
+                    self._send_json({"error": "任务不存在"}, HTTPStatus.NOT_FOUND)
+                    return
+                self._send_json(job.view())
+                return
+
             if path == "/api/run":
                 try:
                     user_id = str(payload.get("user_id") or "").strip()
@@ -600,11 +3131,15 @@ def _make_admin_handler(
                         times_int = 1
                     times_int = max(1, min(times_int, 10))
                     reason = str(payload.get("reason") or "manual").strip() or "manual"
+                    force_raw = payload.get("force", False)
+                    force = force_raw if isinstance(force_raw, bool) else _parse_bool(str(force_raw), False)
                     if user_id:
-                        summary = controller.like_users([user_id], times_int, reason)
+                        summary = controller.like_users([user_id], times_int, reason, force)
                     else:
-                        summary = controller.like_all(times_int, reason)
+                        summary = controller.like_all(times_int, reason, force)
                     self._send_json(summary)
+                except JobQueueFull as e:
+                    self._send_json({"error": str(e)}, HTTPStatus.SERVICE_UNAVAILABLE)
                 except Exception as e:
                     self._send_json({"error": str(e)}, HTTPStatus.INTERNAL_SERVER_ERROR)
                 return
@@ -617,13 +3152,10 @@ def _make_admin_handler(
 def run_admin_server(
     host: str,
     port: int,
-    controller: LikeController,
-    bot: QQAutoLikeBot,
-    store: StateStore,
-    config: Dict[str, Any],
+    accounts: Dict[str, Account],
     admin_token: Optional[str],
 ) -> None:
-    handler = _make_admin_handler(controller, bot, store, config, admin_token)
+    handler = _make_admin_handler(accounts, admin_token)
     httpd = ThreadingHTTPServer((host, port), handler)
     try:
         httpd.serve_forever(poll_interval=0.5)
@@ -631,12 +3163,173 @@ def run_admin_server(
         httpd.server_close()
 
 
+def _parse_targets(value: Any) -> List[str]:
+    if isinstance(value, (list, tuple)):
+        return [str(x).strip() for x in value if str(x).strip()]
+    return [f.strip() for f in str(value or "").split(",") if f.strip()]
+
+
+def _load_account_specs(defaults: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # ACCOUNTS_FILE 为 JSON 列表或 {"accounts": [...]}，未填写的字段沿用环境变量
+    accounts_file = (os.getenv("ACCOUNTS_FILE") or "").strip()
+    if not accounts_file:
+        return [dict(defaults)]
+
+    try:
+        data = json.loads(Path(accounts_file).read_text(encoding="utf-8"))
+    except Exception as e:
+        raise ValueError(f"ACCOUNTS_FILE 读取失败：{accounts_file!r}（{e}）") from e
+    items = data.get("accounts") if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        raise ValueError(f"ACCOUNTS_FILE 中没有账号：{accounts_file!r}")
+
+    specs: List[Dict[str, Any]] = []
+    seen = set()
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValueError(f"ACCOUNTS_FILE 账号格式不正确：{item!r}")
+        name = str(item.get("name") or "").strip()
+        if not name or "/" in name:
+            raise ValueError(f"ACCOUNTS_FILE 账号缺少 name 或包含 '/'：{item!r}")
+        if name in seen:
+            raise ValueError(f"ACCOUNTS_FILE 账号重名：{name!r}")
+        seen.add(name)
+        if not item.get("api_url"):
+            raise ValueError(f"ACCOUNTS_FILE 账号 {name!r} 缺少 api_url")
+
+        spec = dict(defaults)
+        if defaults.get("state_file"):
+            spec["state_file"] = str(Path(defaults["state_file"]).parent / name / "state.json")
+        if defaults.get("friends_file"):
+            spec["friends_file"] = str(Path(defaults["friends_file"]).parent / name / "friends.json")
+        spec.update(item)
+        spec["name"] = name
+        spec["targets"] = _parse_targets(spec.get("targets"))
+        specs.append(spec)
+    return specs
+
+
+def _build_pacer(delay: float, options: Dict[str, Any]) -> Optional[AdaptivePacer]:
+    if not options["pacing_adaptive"] or delay <= 0:
+        return None
+    min_delay = options["pacing_min_delay"] if options["pacing_min_delay"] > 0 else max(0.1, delay / 2)
+    max_delay = options["pacing_max_delay"] if options["pacing_max_delay"] > 0 else max(10.0, delay * 4)
+    return AdaptivePacer(delay, min_delay, max_delay, target_latency=options["pacing_target_latency"])
+
+
+def _build_account(spec: Dict[str, Any], options: Dict[str, Any]) -> Account:
+    api_url = str(spec["api_url"]).rstrip("/")
+    like_times = int(spec["like_times"])
+    delay = int(spec["delay"])
+    state_file = spec.get("state_file") or None
+    history_dir = spec.get("history_dir") or None
+    if not history_dir and options["history_dir"]:
+        history_dir = options["history_dir"]
+        if options["multi_account"]:
+            history_dir = str(Path(history_dir) / spec["name"])
+    if not history_dir and state_file:
+        history_dir = str(Path(state_file).parent / "history")
+    friends_file = spec.get("friends_file") or (str(Path(state_file).parent / "friends.json") if state_file else None)
+    targets_file = str(spec.get("targets_file") or "").strip()
+    targets: Targets = TargetSource(targets_file) if targets_file else spec["targets"]
+
+    bot = QQAutoLikeBot(
+        api_url,
+        spec.get("access_token") or None,
+        pool_size=options["pool_size"],
+        connect_timeout=options["connect_timeout"],
+        read_timeout=options["read_timeout"],
+        name=spec["name"],
+        retry=options["retry"],
+        breaker_threshold=options["breaker_threshold"],
+        breaker_reset=options["breaker_reset"],
+        transport=str(spec.get("transport") or "http").strip().lower(),
+        ws_url=str(spec.get("ws_url") or "").strip(),
+    )
+    store = StateStore(
+        state_file,
+        BotState(schedule_enabled=_parse_bool(str(spec["schedule_enabled"]), True)),
+        flush_delay=options["state_flush_delay"],
+    )
+    plan_targets = store.get().plan_targets
+    controller = LikeController(
+        bot,
+        targets if plan_targets is None else plan_targets,
+        delay,
+        store,
+        engine=options["engine"],
+        concurrency=options["concurrency"],
+        account=spec["name"],
+        ledger=options["ledger"],
+        daily_quota=int(spec["daily_quota"]),
+        history=RunHistory(history_dir, ring_size=options["history_ring_size"]),
+        run_deadline=options["run_deadline"],
+        job_queue_size=options["job_queue_size"],
+        job_workers=options["job_workers"],
+        pacer=_build_pacer(delay, options),
+        friends=FriendIndex(bot.fetch_friend_ids, friends_file, options["friends_ttl"]) if options["friends_filter"] else None,
+    )
+    config: Dict[str, Any] = {
+        "account": spec["name"],
+        "api_url": api_url,
+        "transport": bot.transport.kind,
+        "targets_file": targets_file,
+        "like_times": like_times,
+        "delay": delay,
+        "engine": options["engine"],
+        "schedule_time": ",".join(_parse_schedule_times(spec["schedule_time"])),
+        "schedule_jitter": float(spec.get("schedule_jitter") or 0),
+        "daily_quota": int(spec["daily_quota"]),
+        "daily_targets": int(spec["daily_targets"]),
+        "state_file": state_file or "",
+    }
+    return Account(
+        name=spec["name"],
+        bot=bot,
+        store=store,
+        controller=controller,
+        config=config,
+        napcat_cache=TTLCache(options["napcat_cache_ttl"]),
+        targets=targets,
+        event_secret=str(spec.get("event_secret") or ""),
+    )
+
+
+def _schedule_account(account: Account, scheduler: TimerScheduler, workers: ThreadPoolExecutor) -> None:
+    def run() -> None:
+        if not account.controller.targets and account.store.get().plan_targets is not None:
+            print(f"[{_now_str()}] [{account.name}] 分片计划没有分配目标，跳过本次定时点赞")
+            return
+        try:
+            account.controller.like_all(account.config["like_times"], "scheduled")
+        except Exception as e:
+            print(f"[{_now_str()}] [{account.name}] 定时点赞失败: {e}")
+
+    def like_task() -> None:
+        if not account.store.get().schedule_enabled:
+            print(f"[{_now_str()}] [{account.name}] 自动点赞已关闭，跳过本次定时任务")
+            return
+        workers.submit(run)
+
+    try:
+        scheduler.add_daily(
+            account.name,
+            account.schedule_times(),
+            like_task,
+            jitter=account.config["schedule_jitter"],
+            paused=not account.store.get().schedule_enabled,
+        )
+    except ValueError as e:
+        raise ValueError(f"[{account.name}] {e}") from e
+    account.scheduler = scheduler
+
+
 def main() -> None:
     API_URL = os.getenv("API_URL", "http://localhost:3000")
     ACCESS_TOKEN = os.getenv("ACCESS_TOKEN") or None
 
     target_friends_str = os.getenv("TARGET_FRIENDS", "123456789")
-    TARGET_FRIENDS = [f.strip() for f in target_friends_str.split(",") if f.strip()]
+    TARGET_FRIENDS = _parse_targets(target_friends_str)
 
     LIKE_TIMES = _safe_int_env("LIKE_TIMES", 10)
     DELAY = _safe_int_env("DELAY", 2)
@@ -647,65 +3340,138 @@ def main() -> None:
     ADMIN_PORT = _safe_int_env("ADMIN_PORT", 8080)
     ADMIN_PUBLIC_URL = os.getenv("ADMIN_PUBLIC_URL", "").strip()
     ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "").strip() or None
+    NAPCAT_CACHE_TTL = _safe_float_env("NAPCAT_CACHE_TTL", 5.0)
 
     STATE_FILE = os.getenv("STATE_FILE") or None
     SCHEDULE_ENABLED = _parse_bool(os.getenv("SCHEDULE_ENABLED"), True)
 
-    bot = QQAutoLikeBot(API_URL, ACCESS_TOKEN)
-    store = StateStore(STATE_FILE, BotState(schedule_enabled=SCHEDULE_ENABLED))
-    controller = LikeController(bot, TARGET_FRIENDS, DELAY, store)
-
-    def like_task() -> None:
-        if not store.get().schedule_enabled:
-            print(f"[{_now_str()}] 自动点赞已关闭，跳过本次定时任务")
-            return
-        controller.like_all(LIKE_TIMES, "scheduled")
-
-    schedule.clear()
-    try:
-        schedule.every().day.at(SCHEDULE_TIME).do(like_task)
-    except Exception as e:
-        raise ValueError(f"SCHEDULE_TIME 格式不正确：{SCHEDULE_TIME!r}，应为 HH:MM（例如 09:00）") from e
+    HTTP_POOL_SIZE = _safe_int_env("HTTP_POOL_SIZE", 4)
+    HTTP_CONNECT_TIMEOUT = _safe_float_env("HTTP_CONNECT_TIMEOUT", 3.0)
+    HTTP_READ_TIMEOUT = _safe_float_env("HTTP_READ_TIMEOUT", 10.0)
+
+    LIKE_ENGINE = (os.getenv("LIKE_ENGINE") or "async").strip().lower()
+    if LIKE_ENGINE not in {"async", "sync"}:
+        raise ValueError(f"LIKE_ENGINE 只能是 async 或 sync，当前: {LIKE_ENGINE!r}")
+    LIKE_CONCURRENCY = _safe_int_env("LIKE_CONCURRENCY", HTTP_POOL_SIZE)
+
+    DAILY_LIKE_QUOTA = _safe_int_env("DAILY_LIKE_QUOTA", 10)
+    DAILY_TARGET_LIMIT = _safe_int_env("DAILY_TARGET_LIMIT", 50)
+    LEDGER_FILE = os.getenv("LEDGER_FILE")
+    if LEDGER_FILE is None:
+        LEDGER_FILE = str(Path(STATE_FILE).parent / "likes.sqlite3") if STATE_FILE else ""
+    LEDGER_RETENTION_DAYS = _safe_int_env("LEDGER_RETENTION_DAYS", 30)
+    ledger = LikeLedger(LEDGER_FILE.strip() or None, LEDGER_RETENTION_DAYS)
+
+    specs = _load_account_specs(
+        {
+            "name": "default",
+            "api_url": API_URL,
+            "access_token": ACCESS_TOKEN,
+            "targets": TARGET_FRIENDS,
+            "like_times": LIKE_TIMES,
+            "delay": DELAY,
+            "schedule_time": SCHEDULE_TIME,
+            "schedule_jitter": _safe_float_env("SCHEDULE_JITTER", 0.0),
+            "schedule_enabled": SCHEDULE_ENABLED,
+            "daily_quota": DAILY_LIKE_QUOTA,
+            "daily_targets": DAILY_TARGET_LIMIT,
+            "state_file": STATE_FILE,
+            "friends_file": (os.getenv("FRIENDS_FILE") or "").strip(),
+            "targets_file": (os.getenv("TARGETS_FILE") or "").strip(),
+            "transport": (os.getenv("NAPCAT_TRANSPORT") or "http").strip().lower(),
+            "ws_url": (os.getenv("NAPCAT_WS_URL") or "").strip(),
+            "event_secret": (os.getenv("ONEBOT_EVENT_SECRET") or "").strip(),
+        }
+    )
+    options = {
+        "pool_size": HTTP_POOL_SIZE,
+        "connect_timeout": HTTP_CONNECT_TIMEOUT,
+        "read_timeout": HTTP_READ_TIMEOUT,
+        "engine": LIKE_ENGINE,
+        "concurrency": LIKE_CONCURRENCY,
+        "napcat_cache_ttl": NAPCAT_CACHE_TTL,
+        "ledger": ledger,
+        "state_flush_delay": _safe_float_env("STATE_FLUSH_DELAY", 1.0),
+        "history_dir": (os.getenv("HISTORY_DIR") or "").strip(),
+        "history_ring_size": _safe_int_env("HISTORY_RING_SIZE", 200),
+        "multi_account": len(specs) > 1,
+        "retry": RetryPolicy(
+            max_attempts=max(1, _safe_int_env("RETRY_MAX_ATTEMPTS", 3)),
+            base_delay=_safe_float_env("RETRY_BASE_DELAY", 0.5),
+            max_delay=_safe_float_env("RETRY_MAX_DELAY", 8.0),
+        ),
+        "run_deadline": _safe_float_env("RUN_DEADLINE", 0.0),
+        "job_queue_size": _safe_int_env("JOB_QUEUE_SIZE", 100),
+        "job_workers": _safe_int_env("JOB_WORKERS", 2),
+        "friends_filter": _parse_bool(os.getenv("FRIENDS_FILTER"), True),
+        "friends_ttl": _safe_float_env("FRIENDS_TTL", 3600.0),
+        "breaker_threshold": _safe_int_env("BREAKER_THRESHOLD", 5),
+        "breaker_reset": _safe_float_env("BREAKER_RESET", 30.0),
+        "pacing_adaptive": _parse_bool(os.getenv("PACING_ADAPTIVE"), True),
+        "pacing_min_delay": _safe_float_env("PACING_MIN_DELAY", 0.0),
+        "pacing_max_delay": _safe_float_env("PACING_MAX_DELAY", 0.0),
+        "pacing_target_latency": _safe_float_env("PACING_TARGET_LATENCY", 1.0),
+    }
+    accounts: Dict[str, Account] = {}
+    for spec in specs:
+        account = _build_account(spec, options)
+        accounts[account.name] = account
+
+    # 所有账号共用一个调度器和一个点赞线程池
+    LIKE_WORKERS = _safe_int_env("LIKE_WORKERS", len(accounts))
+    workers = ThreadPoolExecutor(max_workers=max(1, LIKE_WORKERS), thread_name_prefix="account")
+    scheduler = TimerScheduler()
+    for account in accounts.values():
+        _schedule_account(account, scheduler, workers)
 
     print("QQ自动点赞机器人已启动！")
-    print(f"OneBot API: {API_URL.rstrip('/')}")
-    print(f"将在每天 {SCHEDULE_TIME} 自动执行点赞任务（每人 {LIKE_TIMES} 次，间隔 {DELAY}s）")
-    print(f"目标好友: {len(TARGET_FRIENDS)} 个")
+    for account in accounts.values():
+        cfg = account.config
+        prefix = f"[{account.name}] " if len(accounts) > 1 else ""
+        if cfg["transport"] == "ws":
+            print(f"{prefix}OneBot WebSocket: {account.bot.transport.ws_url}")
+        else:
+            print(f"{prefix}OneBot API: {cfg['api_url']}")
+        print(
+            f"{prefix}将在每天 {cfg['schedule_time']} 自动执行点赞任务"
+            f"（每人 {cfg['like_times']} 次，间隔 {cfg['delay']}s）"
+        )
+        source = f"（来自 {cfg['targets_file']}）" if cfg["targets_file"] else ""
+        print(f"{prefix}目标好友: {len(account.targets)} 个{source}")
     if ADMIN_ENABLE:
         public_url = ADMIN_PUBLIC_URL or f"http://localhost:{ADMIN_PORT}"
         print(f"点赞管理页面: {public_url}")
+        if len(accounts) > 1:
+            print(f"多账号模式：各账号管理接口位于 {public_url.rstrip('/')}/a/<name>/")
         if ADMIN_TOKEN:
             print("管理页面已启用 token：请使用 ?token=xxx 访问")
     print("按 Ctrl+C 停止运行\n")
 
-    if ADMIN_ENABLE:
-        stop_event = threading.Event()
-
-        def scheduler_loop() -> None:
-            while not stop_event.is_set():
-                schedule.run_pending()
-                time.sleep(1)
+    def handle_sigterm(signum: int, frame: Any) -> None:
+        # docker stop 发送 SIGTERM：按 Ctrl+C 处理，保证状态落盘
+        raise KeyboardInterrupt
 
-        thread = threading.Thread(target=scheduler_loop, name="scheduler", daemon=True)
-        thread.start()
+    signal.signal(signal.SIGTERM, handle_sigterm)
 
-        admin_config: Dict[str, Any] = {
-            "api_url": API_URL.rstrip("/"),
-            "targets": TARGET_FRIENDS,
-            "like_times": LIKE_TIMES,
-            "delay": DELAY,
-            "schedule_time": SCHEDULE_TIME,
-            "state_file": STATE_FILE or "",
-        }
-        try:
-            run_admin_server(ADMIN_HOST, ADMIN_PORT, controller, bot, store, admin_config, ADMIN_TOKEN)
-        finally:
-            stop_event.set()
-            thread.join(timeout=5)
-    else:
-        while True:
-            schedule.run_pending()
-            time.sleep(60)
+    try:
+        if ADMIN_ENABLE:
+            thread = threading.Thread(target=scheduler.run_forever, name="scheduler", daemon=True)
+            thread.start()
+            try:
+                run_admin_server(ADMIN_HOST, ADMIN_PORT, accounts, ADMIN_TOKEN)
+            finally:
+                scheduler.stop()
+                thread.join(timeout=5)
+        else:
+            scheduler.run_forever()
+    finally:
+        scheduler.stop()
+        workers.shutdown(wait=False)
+        for account in accounts.values():
+            account.controller.close()
+            account.store.close()
+            account.bot.close()
+        ledger.close()
 
 
 if __name__ == "__main__":
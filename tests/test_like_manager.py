@@ -0,0 +1,26 @@
+import time
+
+import like_manager
+
+
+def _aggregator(idle_after):
+    return like_manager.Aggregator([], 1.0, None, like_manager.SnapshotCache(), 5.0, idle_after)
+
+
+def test_aggregator_idles_without_readers():
+    aggregator = _aggregator(idle_after=0.05)
+    time.sleep(0.1)
+    assert not aggregator._active_locked(time.monotonic())
+    aggregator.touch()
+    assert aggregator._wake.is_set()
+    assert aggregator._active_locked(time.monotonic())
+
+
+def test_aggregator_stays_active_while_subscribed():
+    aggregator = _aggregator(idle_after=0.05)
+    aggregator.touch(1)
+    time.sleep(0.1)
+    assert aggregator._active_locked(time.monotonic())
+    aggregator.touch(-1)
+    time.sleep(0.1)
+    assert not aggregator._active_locked(time.monotonic())
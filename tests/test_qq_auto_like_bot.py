@@ -0,0 +1,207 @@
+import json
+from types import SimpleNamespace
+
+import qq_auto_like_bot as bot
+
+
+def _controller(**kwargs):
+    fields = {"friends": None, "ledger": None, "account": "default", "daily_quota": 10}
+    fields.update(kwargs)
+    return SimpleNamespace(**fields)
+
+
+def _plan(controller, targets, times, force=False):
+    counts = {"skipped": 0, "not_friends": []}
+    return list(bot.LikeController._plan(controller, targets, times, force, counts)), counts
+
+
+def _write_targets(tmp_path, lines):
+    path = tmp_path / "targets.jsonl"
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return bot.TargetSource(str(path))
+
+
+def test_plan_file_times_do_not_exceed_requested_times(tmp_path):
+    source = _write_targets(tmp_path, [json.dumps({"user_id": 222, "times": 5}), "111"])
+    plan, _ = _plan(_controller(), source, 1)
+    assert plan == ["222", "111"]
+
+
+def test_plan_file_times_can_lower_requested_times(tmp_path):
+    source = _write_targets(tmp_path, [json.dumps({"user_id": 222, "times": 3}), "111"])
+    plan, _ = _plan(_controller(), source, 10)
+    assert plan == [("222", 3), "111"]
+
+
+def test_plan_skips_non_friends_and_exhausted_targets(tmp_path):
+    source = _write_targets(tmp_path, ["111", "222", "333"])
+    ledger = SimpleNamespace(remaining=lambda account, user_id, quota: 0 if user_id == "333" else 4)
+    friends = SimpleNamespace(ids=lambda: frozenset({"111", "333"}))
+    plan, counts = _plan(_controller(friends=friends, ledger=ledger), source, 10)
+    assert plan == [("111", 4)]
+    assert counts == {"skipped": 1, "not_friends": ["222"]}
+
+
+def _daily_job(times, jitter=0.0):
+    return bot._DailyJob(name="job", times=times, func=lambda: None, jitter=jitter)
+
+
+def test_next_occurrence_picks_earliest_time_today_or_tomorrow():
+    job = _daily_job(["09:00", "21:30"])
+    after = bot.datetime(2024, 5, 1, 10, 0)
+    assert bot.TimerScheduler._next_occurrence(job, after) == bot.datetime(2024, 5, 1, 21, 30)
+    after = bot.datetime(2024, 5, 1, 22, 0)
+    assert bot.TimerScheduler._next_occurrence(job, after) == bot.datetime(2024, 5, 2, 9, 0)
+
+
+def test_next_occurrence_keeps_todays_run_inside_jitter_window():
+    job = _daily_job(["09:00"], jitter=600)
+    day = bot.date(2024, 5, 1)
+    job.offsets[day] = 300.0
+    due = bot.datetime(2024, 5, 1, 9, 5)
+    # 09:00 之后、09:05 之前重新安排（如暂停后恢复），今天这次不能丢
+    assert bot.TimerScheduler._next_occurrence(job, bot.datetime(2024, 5, 1, 9, 2)) == due
+
+
+def test_next_occurrence_does_not_refire_after_run():
+    job = _daily_job(["09:00"], jitter=600)
+    job.offsets[bot.date(2024, 5, 1)] = 300.0
+    job.offsets[bot.date(2024, 5, 2)] = 60.0
+    fired = bot.datetime(2024, 5, 1, 9, 5)
+    assert bot.TimerScheduler._next_occurrence(job, fired) == bot.datetime(2024, 5, 2, 9, 1)
+
+
+def test_circuit_breaker_opens_after_threshold_and_recovers_on_probe():
+    healthy = []
+    breaker = bot.CircuitBreaker(lambda: bool(healthy), failure_threshold=2, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.snapshot()["trips"] == 1
+    assert not breaker.allow()
+    healthy.append(True)
+    assert breaker.allow()
+    assert breaker.snapshot() == {"state": "closed", "consecutive_failures": 0, "trips": 1}
+
+
+def test_circuit_breaker_success_resets_failures():
+    breaker = bot.CircuitBreaker(lambda: True, failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.snapshot()["state"] == "closed"
+
+
+def _like_bot(responses, threshold=2):
+    like_bot = bot.QQAutoLikeBot(
+        "http://127.0.0.1:9", retry=bot.RetryPolicy(max_attempts=3, base_delay=0), breaker_threshold=threshold
+    )
+    replies = iter(responses)
+
+    def post(action, params=None):
+        reply = next(replies)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    like_bot._post = post
+    return like_bot
+
+
+def test_like_verdict_classifies_results():
+    like_bot = _like_bot([])
+    assert like_bot._like_verdict("1", 10, {"status": "ok", "retcode": 0})[0] is True
+    assert like_bot._like_verdict("1", 10, {"status": "failed", "retcode": 1429})[0] is None
+    assert like_bot._like_verdict("1", 10, {"status": "failed", "message": "操作过于频繁"})[0] is None
+    assert like_bot._like_verdict("1", 10, {"status": "failed", "message": "今日点赞次数已达上限"})[0] is False
+
+
+def test_throttling_retries_without_opening_breaker():
+    throttled = {"status": "failed", "retcode": 1429}
+    like_bot = _like_bot([throttled] * 6, threshold=2)
+    for _ in range(2):
+        ok, result = like_bot.send_like_result("1", 10)
+        assert not ok and result["retcode"] == 1429
+    assert like_bot.breaker.snapshot()["state"] == "closed"
+
+
+def test_transport_errors_open_breaker():
+    like_bot = _like_bot([ConnectionError("refused")] * 3, threshold=2)
+    ok, result = like_bot.send_like_result("1", 10)
+    assert not ok and "refused" in result["error"]
+    assert like_bot.breaker.snapshot()["state"] == "open"
+
+
+def _fill_history(history, count):
+    now = bot.time.time()
+    return [
+        history.append({"reason": f"run{i}", "ended_ts": now, "success": 1, "results": [{"user_id": str(i)}]})
+        for i in range(count)
+    ]
+
+
+def test_history_paginates_across_ring_and_segments(tmp_path):
+    history = bot.RunHistory(str(tmp_path), ring_size=3, segment_bytes=200)
+    records = _fill_history(history, 8)
+    assert len(list(tmp_path.glob("runs-*.jsonl"))) > 1
+    seen, cursor = [], None
+    while True:
+        page = history.query(limit=3, cursor=cursor)
+        assert all("results" not in item for item in page["items"])
+        seen += [item["id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [record["id"] for record in reversed(records)]
+
+
+def test_history_since_filter_and_reload(tmp_path):
+    history = bot.RunHistory(str(tmp_path), ring_size=2)
+    records = _fill_history(history, 4)
+    assert history.query(since=bot.time.time() + 60)["items"] == []
+    reloaded = bot.RunHistory(str(tmp_path), ring_size=2)
+    assert [item["id"] for item in reloaded.query(limit=10)["items"]] == [r["id"] for r in reversed(records)]
+
+
+def test_history_detail_keeps_per_target_results(tmp_path):
+    history = bot.RunHistory(str(tmp_path), ring_size=2, segment_bytes=200)
+    records = _fill_history(history, 5)
+    assert history.detail(records[0]["id"])["results"] == [{"user_id": "0"}]
+    assert history.detail(records[-1]["id"])["results"] == [{"user_id": "4"}]
+    assert history.detail(1) is None
+
+
+def test_atomic_write_json_replaces_file(tmp_path):
+    path = tmp_path / "data" / "state.json"
+    bot._atomic_write_json(str(path), {"a": 1})
+    bot._atomic_write_json(str(path), {"a": "二"}, indent=None)
+    assert json.loads(path.read_text(encoding="utf-8")) == {"a": "二"}
+    assert [p.name for p in path.parent.iterdir()] == ["state.json"]
+
+
+def test_plan_shards_balances_and_staggers():
+    accounts = [{"name": "a"}, {"name": "b"}, {"name": "c"}]
+    result = bot.plan_shards([str(i) for i in range(6)], accounts, start="09:00", stagger_minutes=5)
+    assert [len(plan["targets"]) for plan in result["plans"]] == [2, 2, 2]
+    assert [plan["schedule_time"] for plan in result["plans"]] == ["09:00", "09:05", "09:10"]
+    assert result["unassigned"] == []
+
+
+def test_plan_shards_respects_capacity_and_dedupes():
+    accounts = [{"name": "a", "daily_targets": 1}, {"name": "b", "daily_targets": 2}]
+    result = bot.plan_shards(["1", "2", "2", " ", "3", "4", "5"], accounts)
+    assert sorted(t for plan in result["plans"] for t in plan["targets"]) == ["1", "2", "3"]
+    assert result["unassigned"] == ["4", "5"]
+    # 60 分钟窗口、每个目标 delay 3 + 延迟 0.5 秒
+    slow = bot.plan_shards(["1"], [{"name": "a", "delay": 3}])["plans"][0]
+    assert slow["capacity"] == int(3600 // 3.5)
+    assert slow["estimated_seconds"] == 3.5
+
+
+def test_plan_shards_copies_use_distinct_accounts():
+    accounts = [{"name": "a"}, {"name": "b"}, {"name": "c"}]
+    result = bot.plan_shards(["1", "2", "3"], accounts, copies=2)
+    for target in ("1", "2", "3"):
+        owners = [plan["account"] for plan in result["plans"] if target in plan["targets"]]
+        assert len(owners) == 2 and len(set(owners)) == 2
+    assert bot.plan_shards(["1"], [{"name": "a"}], copies=2)["unassigned"] == ["1"]